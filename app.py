@@ -5,123 +5,209 @@ Supports: Question Papers, Marking Schemes, Sample Papers, Compartment Papers
 Years: 2015-2025 | Subjects: Math, Accountancy, Economics, Business Studies, English, Data Science
 """
 
-import io
-import zipfile
-import concurrent.futures
+import json
+import os
+import threading
+from collections import OrderedDict
 from flask import Flask, render_template, jsonify, request, Response, send_file
 from flask_cors import CORS
-import requests
 from paper_database_v3 import (
-    get_all_papers, get_paper_by_id, filter_papers,
-    get_filter_options, SUBJECTS, YEARS, PAPER_TYPES, get_paper_count, get_stats
+    get_all_papers, get_paper_by_id, get_papers_by_ids, filter_papers, get_facet_counts,
+    filter_positions, get_papers_at, offset_after,
+    get_filter_options, SUBJECTS, YEARS, PAPER_TYPES, PUBLIC_FIELDS, get_paper_count, get_stats,
+    get_catalog_version
 )
+from pdf_fetcher import (
+    fetch_pdf, iter_fetch_pdf_batch, open_pdf_stream, open_cached_pdf, pdf_etag, FETCH_WORKERS
+)
+from pdf_cache import memory_cache, paper_cache_key
+from mirror_health import mirror_health
+from zip_stream import stream_zip
+from byte_ranges import byte_range_response
+from availability import (
+    probe_mirrors, paper_statuses, dead_paper_ids, is_cached, start_refresher, AVAILABILITY_DEADLINE
+)
+from availability_index import availability_index
+from zip_jobs import ZipJobQueue, ZIP_JOBS_DIR
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# Different headers for different mirrors
-HEADERS_SUPERCOP = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'application/pdf,*/*',
-    'Referer': 'https://supercop.in/',
-}
-
-HEADERS_SELFSTUDY = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'application/pdf,*/*',
-    'Referer': 'https://www.selfstudys.com/',
-}
-
-HEADERS_CBSE = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'application/pdf,*/*',
-    'Referer': 'https://cbse.gov.in/',
-}
-
-HEADERS_AGLASEM = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'application/pdf,*/*',
-    'Referer': 'https://schools.aglasem.com/',
-}
-
-HEADERS_EXAMFEAR = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'application/pdf,*/*',
-    'Referer': 'https://www.examfear.com/',
-}
-
-# Cache for successful URLs
-url_cache = {}
-
-
-def get_headers_for_mirror(mirror_name):
-    """Get appropriate headers for each mirror"""
-    if 'supercop' in mirror_name:
-        return HEADERS_SUPERCOP
-    elif 'selfstudy' in mirror_name:
-        return HEADERS_SELFSTUDY
-    elif 'aglasem' in mirror_name:
-        return HEADERS_AGLASEM
-    elif 'examfear' in mirror_name:
-        return HEADERS_EXAMFEAR
-    else:
-        return HEADERS_CBSE
+# Keep the availability index fresh in the background
+start_refresher()
 
+# Serialized catalog payloads: name -> (catalog_version, json_bytes)
+payload_cache = {}
 
-def fetch_pdf_from_url(url, headers, timeout=15):
-    """Try to fetch PDF from a single URL"""
-    try:
-        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-        if response.status_code == 200:
-            content = response.content
-            # Verify it's actually a PDF
-            if content[:4] == b'%PDF' or 'pdf' in response.headers.get('Content-Type', '').lower():
-                return content
-    except requests.RequestException:
-        pass
+# Bump when the shape of a catalog API payload changes, so ETags change with it
+API_FORMAT = 1
+
+# Catalog responses only change on deploy; let browsers/CDNs reuse them briefly
+# and revalidate with the ETag afterwards
+CATALOG_CACHE_CONTROL = 'public, max-age=300'
+
+# Real paper PDFs never change once published: let browsers and CDNs keep
+# them for a year without revalidating. The placeholder is never stored
+PDF_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PLACEHOLDER_CACHE_CONTROL = 'no-store'
+
+# Forward single-paper downloads to the client as the mirror sends them,
+# instead of buffering the whole PDF first
+STREAM_DOWNLOADS = True
+
+# /api/papers page size limits
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+# Papers per synchronous ZIP download; larger bundles go through /api/zip-jobs
+MAX_ZIP_PAPERS = 100
+
+# Papers per background ZIP job (a whole subject across every year fits)
+MAX_ZIP_JOB_PAPERS = 1000
+
+# Papers per /api/availability request (one results page at the largest size)
+MAX_AVAILABILITY_BATCH = MAX_PER_PAGE
+
+# Serialized catalog API responses: (etag, normalized request key) -> json_bytes,
+# bounded by entry count and total body size (search-as-you-type makes a new
+# key per keystroke, and a full page is ~60 KB)
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_BYTES = int(os.environ.get('RESPONSE_CACHE_BYTES', 4 * 1024 * 1024))
+response_cache = OrderedDict()
+response_cache_bytes = 0
+response_cache_lock = threading.Lock()
+
+
+def to_json_bytes(data):
+    """Serialize data as compact UTF-8 JSON"""
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def catalog_json(name, build):
+    """Get a pre-serialized payload, rebuilding it only when the catalog changes"""
+    version = get_catalog_version()
+    cached = payload_cache.get(name)
+    if cached is None or cached[0] != version:
+        cached = (version, to_json_bytes(build()))
+        payload_cache[name] = cached
+    return cached[1]
+
+
+# C-accelerated JSON string encoder, used to write paper records directly
+encode_json_string = json.encoder.encode_basestring_ascii
+
+
+def encode_paper_records(papers, fields):
+    """Serialize papers as a JSON array of projected records
+
+    Writes each record straight from the paper's attributes instead of
+    building an intermediate dict per paper.
+    """
+    keys = [encode_json_string(name) + ':' for name in fields]
+    records = []
+    for paper in papers:
+        values = []
+        for key, name in zip(keys, fields):
+            value = getattr(paper, name)
+            if isinstance(value, str):
+                values.append(key + encode_json_string(value))
+            else:
+                values.append(key + json.dumps(value))
+        records.append('{' + ','.join(values) + '}')
+    return ('[' + ','.join(records) + ']').encode('utf-8')
+
+
+def request_json():
+    """The request's JSON object body, {} if it is missing or not an object"""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+
+def invalid_filter(data):
+    """Name of the first filter in a JSON body that is not a string, or None
+
+    Filter values are index keys; a list or object would not even be hashable.
+    """
+    for name in ('year', 'subject', 'type', 'region', 'search'):
+        value = data.get(name)
+        if value is not None and not isinstance(value, str):
+            return name
     return None
 
 
-def fetch_pdf(paper):
-    """Fetch PDF with multiple mirror fallback - tries all URLs until one works"""
-    urls = paper.get('urls', [])
-    paper_id = paper.get('id')
-    
-    # Check cache first
-    if paper_id in url_cache:
-        cached_url, cached_mirror = url_cache[paper_id]
-        headers = get_headers_for_mirror(cached_mirror)
-        content = fetch_pdf_from_url(cached_url, headers)
-        if content:
-            return content, paper['filename']
-    
-    # Try each mirror URL
-    for mirror_name, url in urls:
-        headers = get_headers_for_mirror(mirror_name)
-        content = fetch_pdf_from_url(url, headers)
-        if content:
-            # Cache successful URL
-            url_cache[paper_id] = (url, mirror_name)
-            return content, paper['filename']
-    
-    return None, None
+def valid_paper_ids(paper_ids):
+    """Whether a JSON paper_ids value is a list of integer ids"""
+    return isinstance(paper_ids, list) and all(
+        isinstance(pid, int) and not isinstance(pid, bool) for pid in paper_ids
+    )
 
 
-def fetch_pdf_batch(papers, max_workers=5):
-    """Fetch multiple PDFs concurrently"""
-    results = {}
-    
-    def fetch_single(paper):
-        content, filename = fetch_pdf(paper)
-        return paper['id'], content, filename or paper['filename']
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(fetch_single, p): p['id'] for p in papers}
-        for future in concurrent.futures.as_completed(futures):
-            paper_id, content, filename = future.result()
-            results[paper_id] = (content, filename)
+def json_response(body, status=200):
+    """Wrap already-serialized JSON bytes in a response"""
+    return Response(body, status=status, mimetype='application/json')
+
+
+def catalog_etag():
+    """ETag shared by every response derived only from the catalog"""
+    return f'{get_catalog_version()}-{API_FORMAT}'
+
+
+def cache_response(cache_key, body):
+    """Add a response body to the cache, evicting the least recently used over the limits"""
+    global response_cache_bytes
+    if len(body) > RESPONSE_CACHE_BYTES:
+        return
+    with response_cache_lock:
+        old = response_cache.pop(cache_key, None)
+        if old is not None:
+            response_cache_bytes -= len(old)
+        response_cache[cache_key] = body
+        response_cache_bytes += len(body)
+        while len(response_cache) > RESPONSE_CACHE_SIZE or response_cache_bytes > RESPONSE_CACHE_BYTES:
+            _, evicted = response_cache.popitem(last=False)
+            response_cache_bytes -= len(evicted)
+
+
+def cached_catalog_response(key, build, etag_suffix=None):
+    """Serve a catalog-derived JSON payload with ETag revalidation
+
+    A matching If-None-Match gets a 304 before anything is built. Otherwise
+    the body comes from the in-process response cache, built on a miss.
+    etag_suffix identifies any other state the payload depends on.
+    """
+    etag = catalog_etag()
+    if etag_suffix:
+        etag = f'{etag}-{etag_suffix}'
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        cache_key = (etag, key)
+        with response_cache_lock:
+            body = response_cache.get(cache_key)
+            if body is not None:
+                response_cache.move_to_end(cache_key)
+        if body is None:
+            body = build()
+            cache_response(cache_key, body)
+        response = json_response(body)
     
-    return results
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CATALOG_CACHE_CONTROL
+    return response
+
+
+def build_stats_payload():
+    """Build the /api/stats payload"""
+    stats = get_stats()
+    return {
+        'total_papers': stats['total'],
+        'by_subject': stats['by_subject'],
+        'by_year': stats['by_year'],
+        'by_type': stats['by_type'],
+        'subjects': SUBJECTS,
+        'years': YEARS,
+        'types': PAPER_TYPES
+    }
 
 
 PLACEHOLDER_PDF = b'''%PDF-1.4
@@ -182,53 +268,111 @@ def api_papers():
     paper_type = request.args.get('type')
     region = request.args.get('region')
     search = request.args.get('search')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = request.args.get('per_page', DEFAULT_PER_PAGE, type=int)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    cursor = request.args.get('cursor')
+
+    # Papers known to be on no mirror: shown as usual, ranked last, or hidden
+    unavailable_mode = request.args.get('unavailable', 'show')
+    if unavailable_mode not in ('show', 'last', 'hide'):
+        return jsonify({'error': 'unavailable must be one of: show, last, hide'}), 400
+    unavailable, etag_suffix = None, None
+    if unavailable_mode != 'show':
+        unavailable, fingerprint = dead_paper_ids()
+        etag_suffix = f'{unavailable_mode}-{fingerprint}'
+
+    # Field projection (urls are internal and never exposed)
+    fields = request.args.get('fields')
+    if fields:
+        fields = tuple(name.strip() for name in fields.split(',') if name.strip())
+        unknown = [name for name in fields if name not in PUBLIC_FIELDS]
+        if unknown or not fields:
+            return jsonify({'error': f'Unknown fields: {", ".join(unknown)}',
+                            'allowed_fields': list(PUBLIC_FIELDS)}), 400
+    else:
+        fields = PUBLIC_FIELDS
 
-    papers = filter_papers(year=year, subject=subject, paper_type=paper_type,
-                          region=region, search=search)
+    # Keyset pagination: cursor is the id of the last paper already received
+    if cursor is not None:
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    if search:
+        search = ' '.join(search.lower().split())
+    key = ('papers', year or None, subject or None, paper_type or None, region or None,
+           search or None, page, per_page, cursor, fields)
+    try:
+        return cached_catalog_response(key, lambda: build_papers_body(
+            year, subject, paper_type, region, search, page, per_page, cursor, fields,
+            unavailable, unavailable_mode), etag_suffix)
+    except LookupError:
+        return jsonify({'error': 'Cursor is not part of this result'}), 400
+
+
+def build_papers_body(year, subject, paper_type, region, search, page, per_page, cursor, fields,
+                      unavailable=None, unavailable_mode='show'):
+    """Build the serialized /api/papers payload for one page of results
+
+    Facet counts always cover the whole catalog selection, hidden papers included.
+    """
+    positions = filter_positions(year=year, subject=subject, paper_type=paper_type,
+                                 region=region, search=search, unavailable=unavailable,
+                                 unavailable_mode=unavailable_mode)
     
-    total = len(papers)
+    total = len(positions)
     
-    # Pagination
-    start = (page - 1) * per_page
+    # Pagination: by cursor when given, by page number otherwise
+    if cursor is not None:
+        start = offset_after(positions, cursor)
+        if start is None:
+            raise LookupError(cursor)
+        page = None
+    else:
+        start = (page - 1) * per_page
     end = start + per_page
-    paginated_papers = papers[start:end]
+    paginated_papers = get_papers_at(positions[start:end])
+    next_cursor = paginated_papers[-1].id if paginated_papers and end < total else None
     
-    # Remove urls from response to reduce payload (they're internal)
-    clean_papers = []
-    for p in paginated_papers:
-        clean_p = {k: v for k, v in p.items() if k != 'urls'}
-        clean_papers.append(clean_p)
-
-    return jsonify({
-        'papers': clean_papers,
+    meta = to_json_bytes({
         'total': total,
         'page': page,
         'per_page': per_page,
         'total_pages': (total + per_page - 1) // per_page,
-        'filters': get_filter_options()
+        'next_cursor': next_cursor,
+        'facets': get_facet_counts(year=year, subject=subject, paper_type=paper_type,
+                                   region=region, search=search),
     })
+    # Splice the directly-encoded records and the pre-serialized filter
+    # options around the metadata instead of re-encoding them
+    records = encode_paper_records(paginated_papers, fields)
+    filters = catalog_json('filters', get_filter_options)
+    return b'{"papers":' + records + b',' + meta[1:-1] + b',"filters":' + filters + b'}'
 
 
 @app.route('/api/filters')
 def api_filters():
-    return jsonify(get_filter_options())
+    return cached_catalog_response(('filters',), lambda: catalog_json('filters', get_filter_options))
 
 
 @app.route('/api/stats')
 def api_stats():
     """Get database statistics"""
-    stats = get_stats()
-    return jsonify({
-        'total_papers': stats['total'],
-        'by_subject': stats['by_subject'],
-        'by_year': stats['by_year'],
-        'by_type': stats['by_type'],
-        'subjects': SUBJECTS,
-        'years': YEARS,
-        'types': PAPER_TYPES
-    })
+    return cached_catalog_response(('stats',), lambda: catalog_json('stats', build_stats_payload))
+
+
+@app.route('/api/cache-stats')
+def api_cache_stats():
+    """Get this worker's in-memory PDF cache counters"""
+    return jsonify({'memory': memory_cache.stats()})
+
+
+@app.route('/api/mirror-health')
+def api_mirror_health():
+    """Get this worker's per-mirror success rates, latencies and breaker states"""
+    return jsonify(mirror_health.snapshot())
 
 
 @app.route('/api/download/<int:paper_id>')
@@ -239,19 +383,37 @@ def download_paper(paper_id):
     if not paper:
         return jsonify({'error': 'Paper not found'}), 404
 
-    pdf_content, filename = fetch_pdf(paper)
-
-    if pdf_content:
-        return Response(
-            pdf_content,
-            mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"',
-                'Content-Type': 'application/pdf',
-                'Cache-Control': 'no-cache',
-                'X-Download-Status': 'success'
-            }
-        )
+    headers = {
+        'Content-Disposition': f'attachment; filename="{paper["filename"]}"',
+        'Content-Type': 'application/pdf',
+        'Cache-Control': PDF_CACHE_CONTROL,
+        'X-Download-Status': 'success'
+    }
+
+    # Cached copies are served with Range support (resumed downloads, PDF
+    # viewers loading pages on demand)
+    content, cached_file, size = open_cached_pdf(paper)
+    if content is None and cached_file is None:
+        if STREAM_DOWNLOADS and 'Range' not in request.headers:
+            chunks, filename, content_length = open_pdf_stream(paper, cache_checked=True)
+            if chunks is not None:
+                if content_length:
+                    headers['Content-Length'] = content_length
+                    # Ranges are served once the fetch has filled the cache
+                    headers['Accept-Ranges'] = 'bytes'
+                else:
+                    # No length to detect a truncated transfer with; don't
+                    # let caches keep it
+                    headers['Cache-Control'] = 'no-cache'
+                return Response(chunks, mimetype='application/pdf', headers=headers)
+        else:
+            # A range needs the whole file first; fetch_pdf caches it
+            content, _ = fetch_pdf(paper, cache_checked=True)
+            size = len(content) if content else None
+
+    body = content if content is not None else cached_file
+    if body is not None:
+        return byte_range_response(request, body, size, pdf_etag(paper, body), headers)
 
     # Return placeholder if all mirrors fail
     return Response(
@@ -260,65 +422,87 @@ def download_paper(paper_id):
         headers={
             'Content-Disposition': f'attachment; filename="{paper["filename"]}"',
             'Content-Type': 'application/pdf',
+            'Cache-Control': PLACEHOLDER_CACHE_CONTROL,
             'X-Download-Status': 'placeholder'
         }
     )
 
 
+def zip_entries(papers, progress=None):
+    """ZIP entries for papers in the order their fetches complete, placeholders for failures
+
+    Papers the availability index knows are on no mirror get their
+    placeholder straight away instead of another round of mirror timeouts.
+    progress, if given, is called with True/False as each paper is done.
+    """
+    live = []
+    for paper in papers:
+        if availability_index.is_dead(paper_cache_key(paper)) and not is_cached(paper):
+            if progress:
+                progress(False)
+            yield f"UNAVAILABLE_{paper['filename']}", PLACEHOLDER_PDF
+        else:
+            live.append(paper)
+    for paper, content, filename in iter_fetch_pdf_batch(live, max_workers=FETCH_WORKERS):
+        if progress:
+            progress(bool(content))
+        if content:
+            yield filename, content
+        else:
+            yield f"UNAVAILABLE_{filename}", PLACEHOLDER_PDF
+
+
+# Background builds for bundles too large to stream within one request
+zip_jobs = ZipJobQueue(ZIP_JOBS_DIR, zip_entries)
+
+
+def zip_response(papers, download_name):
+    """Stream a ZIP of papers to the client while the PDFs are still being fetched"""
+    return Response(
+        stream_zip(zip_entries(papers)),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="{download_name}"',
+            'Cache-Control': 'no-cache'
+        }
+    )
+
+
 @app.route('/api/download-zip', methods=['POST'])
 def download_zip():
     """Download multiple papers as ZIP - DIRECT without redirection"""
-    data = request.get_json()
+    data = request_json()
     paper_ids = data.get('paper_ids', [])
 
     if not paper_ids:
         return jsonify({'error': 'No papers selected'}), 400
 
-    if len(paper_ids) > 100:
-        return jsonify({'error': 'Maximum 100 papers per download'}), 400
+    if not valid_paper_ids(paper_ids):
+        return jsonify({'error': 'paper_ids must be a list of integer ids'}), 400
+
+    if len(paper_ids) > MAX_ZIP_PAPERS:
+        return jsonify({'error': f'Maximum {MAX_ZIP_PAPERS} papers per download, use /api/zip-jobs for more'}), 400
 
     # Get all papers
-    papers = [get_paper_by_id(pid) for pid in paper_ids]
-    papers = [p for p in papers if p is not None]
+    papers, missing_ids = get_papers_by_ids(paper_ids)
 
     if not papers:
         return jsonify({'error': 'No valid papers found'}), 404
 
-    # Fetch PDFs concurrently
-    results = fetch_pdf_batch(papers, max_workers=10)
-
-    zip_buffer = io.BytesIO()
-    success_count = 0
-    fail_count = 0
-
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for paper in papers:
-            paper_id = paper['id']
-            content, filename = results.get(paper_id, (None, paper['filename']))
-
-            if content:
-                zip_file.writestr(filename, content)
-                success_count += 1
-            else:
-                # Add placeholder for failed downloads
-                zip_file.writestr(f"UNAVAILABLE_{filename}", PLACEHOLDER_PDF)
-                fail_count += 1
-
-    zip_buffer.seek(0)
-
-    return send_file(
-        zip_buffer,
-        mimetype='application/zip',
-        as_attachment=True,
-        download_name='CBSE_Papers.zip'
-    )
+    response = zip_response(papers, 'CBSE_Papers.zip')
+    if missing_ids:
+        response.headers['X-Unknown-Paper-Ids'] = ','.join(str(pid) for pid in missing_ids)
+    return response
 
 
 @app.route('/api/download-filtered', methods=['POST'])
 def download_filtered():
     """Download all papers matching current filters as ZIP"""
-    data = request.get_json()
-    
+    data = request_json()
+    invalid = invalid_filter(data)
+    if invalid:
+        return jsonify({'error': f'{invalid} must be a string'}), 400
+
     year = data.get('year')
     subject = data.get('subject')
     paper_type = data.get('type')
@@ -329,32 +513,101 @@ def download_filtered():
     if not papers:
         return jsonify({'error': 'No papers match the filters'}), 404
     
-    if len(papers) > 100:
-        return jsonify({'error': f'Too many papers ({len(papers)}). Please narrow your filters. Max 100.'}), 400
-    
-    # Fetch PDFs concurrently
-    results = fetch_pdf_batch(papers, max_workers=10)
+    if len(papers) > MAX_ZIP_PAPERS:
+        return jsonify({'error': f'Too many papers ({len(papers)}). Please narrow your filters. '
+                                 f'Max {MAX_ZIP_PAPERS}, use /api/zip-jobs for more.'}), 400
     
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for paper in papers:
-            paper_id = paper['id']
-            content, filename = results.get(paper_id, (None, paper['filename']))
-            
-            if content:
-                zip_file.writestr(filename, content)
-            else:
-                zip_file.writestr(f"UNAVAILABLE_{filename}", PLACEHOLDER_PDF)
-    
-    zip_buffer.seek(0)
-    
-    return send_file(
-        zip_buffer,
-        mimetype='application/zip',
-        as_attachment=True,
-        download_name='CBSE_Papers_Filtered.zip'
-    )
+    return zip_response(papers, 'CBSE_Papers_Filtered.zip')
+
+
+@app.route('/api/zip-jobs', methods=['POST'])
+def submit_zip_job():
+    """Queue a ZIP of any number of papers (given ids, or a filter set) to build in the background"""
+    data = request_json()
+    missing_ids = []
+
+    if 'paper_ids' in data:
+        paper_ids = data['paper_ids']
+        if not valid_paper_ids(paper_ids) or not paper_ids:
+            return jsonify({'error': 'paper_ids must be a non-empty list of integer ids'}), 400
+        if len(paper_ids) > MAX_ZIP_JOB_PAPERS:
+            return jsonify({'error': f'Maximum {MAX_ZIP_JOB_PAPERS} papers per ZIP job'}), 400
+        # Each paper once, in the order requested
+        papers, missing_ids = get_papers_by_ids(list(dict.fromkeys(paper_ids)))
+        download_name = 'CBSE_Papers.zip'
+    else:
+        invalid = invalid_filter(data)
+        if invalid:
+            return jsonify({'error': f'{invalid} must be a string'}), 400
+        # Never queue the whole catalog for a missing, mangled or empty filter set
+        if not any((data.get(name) or '').strip() for name in ('year', 'subject', 'type', 'region', 'search')):
+            return jsonify({'error': 'Expected paper_ids or at least one non-empty filter'}), 400
+        papers = filter_papers(year=data.get('year'), subject=data.get('subject'),
+                               paper_type=data.get('type'), region=data.get('region'),
+                               search=data.get('search'))
+        download_name = 'CBSE_Papers_Filtered.zip'
+
+    if not papers:
+        return jsonify({'error': 'No valid papers found'}), 404
+
+    if len(papers) > MAX_ZIP_JOB_PAPERS:
+        return jsonify({'error': f'Too many papers ({len(papers)}). Please narrow your filters. '
+                                 f'Max {MAX_ZIP_JOB_PAPERS} per ZIP job.'}), 400
+
+    job = zip_jobs.submit(papers, download_name)
+    if job is None:
+        response = jsonify({'error': 'Too many ZIP jobs in progress, please try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    body = zip_job_body(job)
+    if missing_ids:
+        body['unknown_ids'] = missing_ids
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers['Location'] = body['status_url']
+    return response
+
+
+@app.route('/api/zip-jobs/<job_id>')
+def zip_job_status(job_id):
+    """Progress of a ZIP job, with its download URL once done"""
+    job = zip_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found (it may have expired)'}), 404
+    return jsonify(zip_job_body(job))
+
+
+@app.route('/api/zip-jobs/<job_id>/download')
+def download_zip_job(job_id):
+    """Download a finished ZIP job's archive"""
+    job = zip_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found (it may have expired)'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': f'Job is {job["status"]}', 'status': job['status']}), 409
+    try:
+        return send_file(zip_jobs.archive_path(job_id), mimetype='application/zip',
+                         as_attachment=True, download_name=job['download_name'])
+    except FileNotFoundError:
+        return jsonify({'error': 'Job not found (it may have expired)'}), 404
+
+
+def zip_job_body(job):
+    """Public view of a ZIP job's state"""
+    body = {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'total': job['total'],
+        'fetched': job['fetched'],
+        'failed': job['failed'],
+        'status_url': f"/api/zip-jobs/{job['job_id']}",
+    }
+    if job['status'] == 'done':
+        body['download_url'] = f"/api/zip-jobs/{job['job_id']}/download"
+    if 'error' in job:
+        body['error'] = job['error']
+    return body
 
 
 @app.route('/api/check/<int:paper_id>')
@@ -364,30 +617,9 @@ def check_paper(paper_id):
     if not paper:
         return jsonify({'error': 'Not found'}), 404
 
-    urls = paper.get('urls', [])
-    results = []
-    
-    for mirror_name, url in urls:
-        headers = get_headers_for_mirror(mirror_name)
-        try:
-            response = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
-            results.append({
-                'mirror': mirror_name,
-                'url': url,
-                'status': response.status_code,
-                'available': response.status_code == 200
-            })
-        except Exception as e:
-            results.append({
-                'mirror': mirror_name,
-                'url': url,
-                'status': 0,
-                'available': False,
-                'error': str(e)
-            })
-    
+    results = probe_mirrors(paper)
     available = any(r['available'] for r in results)
-    
+
     return jsonify({
         'id': paper_id,
         'display_name': paper['display_name'],
@@ -396,6 +628,37 @@ def check_paper(paper_id):
     })
 
 
+
+@app.route('/api/availability', methods=['POST'])
+def availability():
+    """Availability status for many papers at once: given ids, or a filter set"""
+    data = request_json()
+    paper_ids = data.get('paper_ids')
+    missing_ids = []
+
+    if paper_ids is not None:
+        if not valid_paper_ids(paper_ids):
+            return jsonify({'error': 'paper_ids must be a list of integer ids'}), 400
+        papers, missing_ids = get_papers_by_ids(paper_ids)
+    else:
+        invalid = invalid_filter(data)
+        if invalid:
+            return jsonify({'error': f'{invalid} must be a string'}), 400
+        papers = filter_papers(year=data.get('year'), subject=data.get('subject'),
+                               paper_type=data.get('type'), region=data.get('region'),
+                               search=data.get('search'))
+
+    if len(papers) > MAX_AVAILABILITY_BATCH:
+        return jsonify({
+            'error': f'Too many papers ({len(papers)}). Max {MAX_AVAILABILITY_BATCH} per request.'
+        }), 400
+
+    statuses = paper_statuses(papers, timeout=AVAILABILITY_DEADLINE)
+    body = {'statuses': {str(paper_id): status for paper_id, status in statuses.items()}}
+    if missing_ids:
+        body['unknown_ids'] = missing_ids
+    return jsonify(body)
+
 if __name__ == '__main__':
     print(f"Starting CBSE Papers Server with {get_paper_count()} papers in database")
     app.run(host='0.0.0.0', port=12000, debug=True)
@@ -0,0 +1,285 @@
+"""
+CBSE Previous Year Papers - Mirror availability probing
+Probes paper URLs concurrently (the first bytes must be a PDF, as for a
+download) and remembers each URL's result for a TTL
+Backs /api/check (per-mirror detail) and /api/availability (batch status map)
+Paper-level results go to the persisted availability index, which a
+background thread keeps fresh; run directly to refresh it in one go:
+
+    python availability.py [--all]
+"""
+
+import argparse
+import fcntl
+import hashlib
+import os
+import sys
+import threading
+import time
+import concurrent.futures
+import requests
+from paper_database_v3 import get_all_papers, get_catalog_version
+from pdf_cache import pdf_cache, memory_cache, paper_cache_key
+from pdf_fetcher import get_session, get_candidate_urls, classify_exception
+from fetch_scheduler import mirror_limiter
+from mirror_health import mirror_health, classify_status
+from availability_index import availability_index, AVAILABILITY_INDEX_PATH
+
+# Probe request timeout (seconds)
+PROBE_TIMEOUT = 5
+
+# Bytes a probe asks for: enough to check the %PDF magic, since some mirrors
+# answer 200 with an HTML page where the PDF should be
+PROBE_BYTES = 1024
+
+# How long a probe result is reused: definite answers (200, 404, ...) for
+# longer than timeouts/connection errors, which are often transient
+PROBE_TTL = 600
+PROBE_ERROR_TTL = 60
+
+# Threads probing at once (each mirror is still capped by mirror_limiter)
+PROBE_WORKERS = 16
+
+# Longest /api/availability waits for probes (seconds); papers not resolved
+# by then are reported 'unknown' while their probes finish in the background
+AVAILABILITY_DEADLINE = 8
+
+probe_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=PROBE_WORKERS, thread_name_prefix='probe'
+)
+
+# url -> (expires_at, result)
+probe_cache = {}
+probe_cache_lock = threading.Lock()
+
+# Background refresh: every REFRESH_INTERVAL seconds one worker re-checks up
+# to AVAILABILITY_REFRESH_BATCH papers that are unchecked or due (0 disables).
+# Only the worker holding the lock file refreshes, so the mirrors aren't
+# probed once per worker; the others take over if it exits
+REFRESH_INTERVAL = 60
+AVAILABILITY_REFRESH_BATCH = int(os.environ.get('AVAILABILITY_REFRESH_BATCH', 50))
+REFRESH_LOCK_PATH = AVAILABILITY_INDEX_PATH + '.lock'
+
+# Threads the background refresh probes with, kept apart from probe_executor
+# so /api/check and /api/availability never queue behind it
+REFRESH_WORKERS = 4
+refresh_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=REFRESH_WORKERS, thread_name_prefix='refresh'
+)
+
+# (index version, catalog version) -> (dead paper ids, fingerprint)
+dead_ids_cache = {}
+refresher_lock = threading.Lock()
+refresher = None
+
+
+def probe_url(mirror_name, url):
+    """Probe one mirror URL with a ranged GET, reusing a recent result
+
+    Returns {'status': HTTP status or 0, 'available': bool} plus 'error' when
+    the request failed. Outcomes feed mirror_health like fetches do, so
+    probes trip a failing mirror's circuit breaker too.
+    """
+    now = time.monotonic()
+    with probe_cache_lock:
+        cached = probe_cache.get(url)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    if not mirror_limiter.acquire(url, PROBE_TIMEOUT):
+        # Mirror saturated by downloads: don't remember this
+        return {'status': 0, 'available': False, 'error': 'mirror busy'}
+    started = time.monotonic()
+    try:
+        with get_session(mirror_name).get(url, headers={'Range': f'bytes=0-{PROBE_BYTES - 1}'},
+                                          timeout=PROBE_TIMEOUT, allow_redirects=True, stream=True) as response:
+            status = response.status_code
+            first_bytes = b''
+            if status in (200, 206):
+                for chunk in response.iter_content(chunk_size=PROBE_BYTES):
+                    first_bytes += chunk
+                    if len(first_bytes) >= 4:
+                        break
+        result = {'status': status, 'available': first_bytes[:4] == b'%PDF'}
+        ttl = PROBE_ERROR_TTL if status == 429 or status >= 500 else PROBE_TTL
+        if result['available']:
+            mirror_health.record_success(url, time.monotonic() - started)
+        elif status in (200, 206):
+            result['error'] = 'not a PDF'
+            mirror_health.record_failure(url, 'not_pdf')
+        else:
+            mirror_health.record_failure(url, classify_status(status))
+    except requests.RequestException as e:
+        result = {'status': 0, 'available': False, 'error': str(e)}
+        ttl = PROBE_ERROR_TTL
+        mirror_health.record_failure(url, classify_exception(e))
+    finally:
+        mirror_limiter.release(url)
+
+    with probe_cache_lock:
+        probe_cache[url] = (time.monotonic() + ttl, result)
+    return result
+
+
+def probe_mirrors(paper):
+    """Probe all of a paper's mirror URLs concurrently, in catalog order"""
+    urls = list(paper.get('urls', []))
+    futures = [probe_executor.submit(probe_url, mirror_name, url) for mirror_name, url in urls]
+    return [
+        dict(future.result(), mirror=mirror_name, url=url)
+        for (mirror_name, url), future in zip(urls, futures)
+    ]
+
+
+def is_cached(paper):
+    """Whether the paper's PDF is in the local caches (without touching LRU order)"""
+    key = paper_cache_key(paper)
+    return key in memory_cache.entries or pdf_cache.contains(key)
+
+
+def probe_paper(paper):
+    """Probe a paper's mirrors in download order, stopping at the first that has it
+
+    Returns (status, mirror_name, url); mirror_name/url only for 'available'.
+    'unknown' means no mirror had it but at least one could not be asked
+    (timeout, connection error, 5xx, busy, open circuit breaker).
+    """
+    candidates = get_candidate_urls(paper)
+    uncertain = len(candidates) < len(paper.get('urls', []))
+    for mirror_name, url in candidates:
+        result = probe_url(mirror_name, url)
+        if result['available']:
+            return 'available', mirror_name, url
+        if result['status'] == 0 or result['status'] == 429 or result['status'] >= 500:
+            uncertain = True
+    return ('unknown' if uncertain else 'unavailable'), None, None
+
+
+def paper_status(paper):
+    """Availability of one paper: 'cached', 'available', 'unavailable' or 'unknown'
+
+    The result is recorded in the availability index.
+    """
+    key = paper_cache_key(paper)
+    if is_cached(paper):
+        availability_index.record(key, 'cached')
+        return 'cached'
+    status, mirror_name, url = probe_paper(paper)
+    availability_index.record(key, status, mirror_name, url)
+    return status
+
+
+def paper_statuses(papers, timeout=None, executor=probe_executor):
+    """Availability of many papers, probed concurrently: {paper_id: status}
+
+    Papers still being probed after timeout seconds are 'unknown'; their
+    probes carry on and record into the index when they finish.
+    """
+    futures = {executor.submit(paper_status, paper): paper['id'] for paper in papers}
+    done, _ = concurrent.futures.wait(futures, timeout=timeout)
+    return {
+        paper_id: future.result() if future in done else 'unknown'
+        for future, paper_id in futures.items()
+    }
+
+
+def dead_paper_ids():
+    """Ids of catalog papers the index knows no mirror has, and a fingerprint
+
+    Returns (frozenset of ids, short hash of them); the fingerprint lets
+    responses that depend on the set be validated across workers.
+    """
+    version = (availability_index.version, get_catalog_version())
+    cached = dead_ids_cache.get(version)
+    if cached is not None:
+        return cached
+    ids = frozenset(
+        paper['id'] for paper in get_all_papers() if availability_index.is_dead(paper_cache_key(paper))
+    )
+    fingerprint = hashlib.sha256(','.join(map(str, sorted(ids))).encode()).hexdigest()[:12]
+    dead_ids_cache.clear()
+    dead_ids_cache[version] = (ids, fingerprint)
+    return ids, fingerprint
+
+
+def stale_papers(limit=None):
+    """Catalog papers never checked or due for a re-check, never-checked first"""
+    now = time.time()
+    stale = [paper for paper in get_all_papers() if availability_index.is_stale(paper_cache_key(paper), now)]
+    stale.sort(key=lambda paper: (availability_index.get(paper_cache_key(paper)) or {}).get('checked_at', 0))
+    return stale[:limit] if limit is not None else stale
+
+
+def refresh_batch(limit):
+    """Re-check up to limit stale papers and save the index, returns how many were checked"""
+    availability_index.reload()
+    papers = stale_papers(limit)
+    if papers:
+        paper_statuses(papers, executor=refresh_executor)
+    availability_index.save()
+    return len(papers)
+
+
+def acquire_refresh_lock():
+    """Try to become the refreshing process: the held lock file, or None if another has it
+
+    The lock is released when the process exits. Where the lock file can't
+    be created there is no shared index to coordinate through either, so
+    every process refreshes (returns True).
+    """
+    try:
+        lock_file = open(REFRESH_LOCK_PATH, 'a')
+    except OSError:
+        return True
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def run_refresher():
+    lock = None
+    while True:
+        time.sleep(REFRESH_INTERVAL)
+        if lock is None:
+            lock = acquire_refresh_lock()
+            if lock is None:
+                continue
+        try:
+            refresh_batch(AVAILABILITY_REFRESH_BATCH)
+        except Exception as e:
+            # Keep refreshing; one bad round (disk full, catalog reload) isn't fatal
+            print(f"Availability refresh failed: {e}", file=sys.stderr)
+
+
+def start_refresher():
+    """Start this worker's background refresh thread (once; no-op when disabled)"""
+    global refresher
+    if AVAILABILITY_REFRESH_BATCH <= 0:
+        return
+    with refresher_lock:
+        if refresher is None:
+            refresher = threading.Thread(target=run_refresher, name='availability-refresh', daemon=True)
+            refresher.start()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Refresh the paper availability index')
+    parser.add_argument('--all', action='store_true', help='Re-check every paper, not just stale ones')
+    args = parser.parse_args(argv)
+
+    availability_index.reload()
+    papers = get_all_papers() if args.all else stale_papers()
+    print(f"Checking {len(papers)} papers", flush=True)
+    paper_statuses(papers)
+    availability_index.save()
+    counts = availability_index.counts()
+    print(", ".join(f"{status}: {count}" for status, count in counts.items()))
+    print(f"Saved to {availability_index.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
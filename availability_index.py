@@ -0,0 +1,153 @@
+"""
+CBSE Previous Year Papers - Availability index
+Persisted record of which papers the mirrors can actually serve:
+paper -> status, last known good mirror, checked-at
+Filled by availability probes and successful fetches, shared by all workers
+through a JSON file beside the PDF cache
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pdf_cache import PDF_CACHE_DIR
+
+AVAILABILITY_INDEX_PATH = os.environ.get(
+    'AVAILABILITY_INDEX_PATH', os.path.normpath(PDF_CACHE_DIR) + '.availability.json'
+)
+
+# Age (seconds) after which an entry is due for a re-check; 'unknown' means a
+# mirror couldn't be asked last time, so those are retried sooner
+AVAILABILITY_MAX_AGE = 24 * 3600
+AVAILABILITY_UNKNOWN_MAX_AGE = 3600
+
+# Statuses kept in the index ('cached' from a probe is stored as 'available')
+STATUSES = ('available', 'unavailable', 'unknown')
+
+
+class AvailabilityIndex:
+    """Thread-safe paper availability map, keyed by paper cache key (filename)
+
+    Entries are {'status', 'mirror', 'url', 'checked_at'}; mirror/url are
+    the last mirror that served the paper and survive later failed checks.
+    save() merges with the file on disk, newest check winning, so workers
+    refreshing different papers don't overwrite each other.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.version = 0
+        self.dirty = False
+        self.loaded_mtime = None
+
+    def get(self, key):
+        with self.lock:
+            return self.entries.get(key)
+
+    def is_dead(self, key):
+        """Whether the paper is known to be on no mirror"""
+        entry = self.get(key)
+        return entry is not None and entry['status'] == 'unavailable'
+
+    def is_stale(self, key, now=None):
+        """Whether the paper was never checked or is due for a re-check"""
+        entry = self.get(key)
+        if entry is None:
+            return True
+        max_age = AVAILABILITY_UNKNOWN_MAX_AGE if entry['status'] == 'unknown' else AVAILABILITY_MAX_AGE
+        return (now or time.time()) - entry['checked_at'] > max_age
+
+    def record(self, key, status, mirror_name=None, url=None):
+        """Record a check result; url/mirror_name only for a mirror that served the paper"""
+        if status == 'cached':
+            status = 'available'
+        with self.lock:
+            previous = self.entries.get(key)
+            entry = {'status': status, 'mirror': mirror_name, 'url': url, 'checked_at': time.time()}
+            if url is None and previous is not None:
+                entry['mirror'], entry['url'] = previous['mirror'], previous['url']
+            if previous is None or previous['status'] != status:
+                self.version += 1
+            self.entries[key] = entry
+            self.dirty = True
+
+    def _merge(self, saved):
+        """Merge entries read from disk (caller holds the lock), newest wins"""
+        changed = False
+        for key, entry in saved.items():
+            if not isinstance(entry, dict) or entry.get('status') not in STATUSES:
+                continue
+            current = self.entries.get(key)
+            if current is None or entry.get('checked_at', 0) > current['checked_at']:
+                if current is None or current['status'] != entry['status']:
+                    changed = True
+                self.entries[key] = {
+                    'status': entry['status'], 'mirror': entry.get('mirror'),
+                    'url': entry.get('url'), 'checked_at': entry.get('checked_at', 0),
+                }
+        if changed:
+            self.version += 1
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return saved if isinstance(saved, dict) else {}
+
+    def reload(self):
+        """Pick up checks other workers saved since the last load"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self.loaded_mtime:
+            return
+        saved = self._read()
+        with self.lock:
+            self._merge(saved)
+            self.loaded_mtime = mtime
+
+    def save(self):
+        """Write unsaved checks to disk, merged with what other workers saved"""
+        with self.lock:
+            if not self.dirty:
+                return
+        saved = self._read()
+        with self.lock:
+            self._merge(saved)
+            data = dict(self.entries)
+            self.dirty = False
+
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.availability.', suffix='.tmp')
+        except OSError:
+            # Read-only location: keep the index in memory only
+            return
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self.loaded_mtime = os.path.getmtime(self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def counts(self):
+        with self.lock:
+            counts = dict.fromkeys(STATUSES, 0)
+            for entry in self.entries.values():
+                counts[entry['status']] += 1
+            return counts
+
+
+# Process-wide index, seeded from what earlier checks saved
+availability_index = AvailabilityIndex(AVAILABILITY_INDEX_PATH)
+availability_index.reload()
@@ -0,0 +1,176 @@
+"""
+CBSE Previous Year Papers - Byte range responses
+Serves locally cached PDFs with HTTP Range support (RFC 7233): single ranges,
+multipart/byteranges for several, and If-Range so a resumed download only
+gets the rest of the file if it hasn't changed
+Also answers If-None-Match revalidation with 304 Not Modified
+"""
+
+import re
+import secrets
+from flask import Response
+
+# Bytes read from a cached file per chunk
+READ_CHUNK_SIZE = 64 * 1024
+
+# More ranges than this (after merging) and the whole file is sent instead;
+# guards against requests for thousands of tiny ranges
+MAX_RANGES = 16
+
+# ASCII digits only: str.isdigit() also accepts characters such as '²' that
+# int() rejects
+DIGITS = re.compile(r'[0-9]*')
+
+
+def parse_byte_ranges(range_header):
+    """Parse a "bytes=" Range header into (start, stop) pairs, None if malformed
+
+    stop is exclusive, or None for an open-ended range; a suffix range
+    ("-500") is (-500, None). Unlike werkzeug's parser this accepts ranges
+    out of order and overlapping, which RFC 7233 allows.
+    """
+    units, _, spec = range_header.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash or not DIGITS.fullmatch(first) or not DIGITS.fullmatch(last):
+            return None
+        if not first:
+            if not last or int(last) == 0:
+                return None
+            ranges.append((-int(last), None))
+        elif not last:
+            ranges.append((int(first), None))
+        elif int(last) >= int(first):
+            ranges.append((int(first), int(last) + 1))
+        else:
+            return None
+    return ranges or None
+
+
+def satisfiable_ranges(range_header, length):
+    """Resolve a Range header against a file length
+
+    Returns a sorted, merged list of (start, stop) byte offsets (stop
+    exclusive), [] if no range overlaps the file (416), or None if the header
+    is absent, malformed or not worth honouring (send the whole file).
+    """
+    parsed = parse_byte_ranges(range_header)
+    if parsed is None:
+        return None
+
+    ranges = []
+    for start, stop in parsed:
+        if start < 0:
+            # Suffix range: the last -start bytes
+            start, stop = max(0, length + start), length
+        elif stop is None or stop > length:
+            stop = length
+        if start < stop:
+            ranges.append((start, stop))
+
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    if len(merged) > MAX_RANGES or merged == [(0, length)]:
+        return None
+    return merged
+
+
+def read_range(body, start, stop):
+    """Yield bytes start..stop of body (bytes or a seekable binary file)"""
+    if isinstance(body, bytes):
+        yield body[start:stop]
+        return
+    body.seek(start)
+    remaining = stop - start
+    while remaining > 0:
+        chunk = body.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def byte_range_response(request, body, length, etag, headers, mimetype='application/pdf'):
+    """Respond with body, or the parts of it the request's Range header asks for
+
+    body is the complete file as bytes or an open binary file (closed with
+    the response). etag is the body's strong validator: a matching
+    If-None-Match gets 304, an If-Range that doesn't match it gets the whole
+    file, as does a Range header that can't be used.
+    """
+    headers = dict(headers)
+    headers['Accept-Ranges'] = 'bytes'
+    headers['ETag'] = f'"{etag}"'
+
+    # Evaluated before Range (RFC 7232 section 6)
+    if request.if_none_match.contains_weak(etag):
+        if not isinstance(body, bytes):
+            body.close()
+        not_modified = {'ETag': headers['ETag']}
+        if 'Cache-Control' in headers:
+            not_modified['Cache-Control'] = headers['Cache-Control']
+        return Response(status=304, headers=not_modified)
+
+    ranges = None
+    if 'Range' in request.headers:
+        if_range = request.headers.get('If-Range')
+        # If-Range needs a strong match; a date can't match since cached files
+        # don't keep a meaningful Last-Modified
+        if if_range is None or if_range == headers['ETag']:
+            ranges = satisfiable_ranges(request.headers['Range'], length)
+
+    if ranges is None:
+        status = 200
+        headers['Content-Length'] = str(length)
+        chunks = read_range(body, 0, length)
+    elif not ranges:
+        response = Response(status=416, headers={'Content-Range': f'bytes */{length}', 'Accept-Ranges': 'bytes'})
+        if not isinstance(body, bytes):
+            body.close()
+        return response
+    elif len(ranges) == 1:
+        status = 206
+        start, stop = ranges[0]
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+        headers['Content-Length'] = str(stop - start)
+        chunks = read_range(body, start, stop)
+    else:
+        status = 206
+        boundary = secrets.token_hex(16)
+        parts = [
+            ((f'--{boundary}\r\nContent-Type: {mimetype}\r\n'
+              f'Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n').encode(), start, stop)
+            for start, stop in ranges
+        ]
+        closing = f'--{boundary}--\r\n'.encode()
+        headers['Content-Length'] = str(
+            sum(len(head) + (stop - start) + 2 for head, start, stop in parts) + len(closing)
+        )
+        mimetype = f'multipart/byteranges; boundary={boundary}'
+        headers.pop('Content-Type', None)
+        chunks = multipart_chunks(body, parts, closing)
+
+    response = Response(chunks, status=status, mimetype=mimetype, headers=headers)
+    if not isinstance(body, bytes):
+        response.call_on_close(body.close)
+    return response
+
+
+def multipart_chunks(body, parts, closing):
+    """Yield a multipart/byteranges body"""
+    for head, start, stop in parts:
+        yield head
+        yield from read_range(body, start, stop)
+        yield b'\r\n'
+    yield closing
@@ -0,0 +1,133 @@
+"""
+CBSE Previous Year Papers - Fetch scheduling
+One long-lived pool per process runs every upstream paper fetch
+Caps concurrent fetches globally and per mirror host, and queues work fairly
+across requests so a large ZIP build can't starve single downloads
+"""
+
+import threading
+import time
+import concurrent.futures
+from collections import OrderedDict, deque
+from mirror_health import mirror_key
+
+# Paper fetches running at once in this process, across all requests
+FETCH_CONCURRENCY = 20
+
+# Open requests to any single mirror host at once
+MIRROR_CONCURRENCY = 6
+
+# How often a cancellable wait for a mirror slot checks for cancellation (seconds)
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class FetchScheduler:
+    """Fixed pool of fetch threads fed round-robin from per-request queues
+
+    Each request submits under its own client key. Idle threads take the
+    next job from the client at the head of the rotation, which then moves
+    to the back, so a request with one paper waits for at most one job per
+    other active request instead of behind a whole queued bundle.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.queues = OrderedDict()
+        self.cond = threading.Condition()
+        self.threads = []
+        self.running = 0
+
+    def submit(self, client, fn, *args):
+        """Queue fn(*args) on behalf of client, returns a Future"""
+        future = concurrent.futures.Future()
+        with self.cond:
+            if not self.threads:
+                self._start_threads()
+            queue = self.queues.get(client)
+            if queue is None:
+                queue = self.queues[client] = deque()
+            queue.append((future, fn, args))
+            self.cond.notify()
+        return future
+
+    def _start_threads(self):
+        for index in range(self.max_workers):
+            thread = threading.Thread(target=self._work, name=f'fetch-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _next_job(self):
+        with self.cond:
+            while not self.queues:
+                self.cond.wait()
+            client, queue = self.queues.popitem(last=False)
+            job = queue.popleft()
+            if queue:
+                # Back of the rotation for this client's next job
+                self.queues[client] = queue
+            self.running += 1
+            return job
+
+    def _work(self):
+        while True:
+            future, fn, args = self._next_job()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.cond:
+                    self.running -= 1
+
+    def stats(self):
+        with self.cond:
+            return {
+                'max_workers': self.max_workers,
+                'running': self.running,
+                'queued': sum(len(queue) for queue in self.queues.values()),
+                'clients': len(self.queues),
+            }
+
+
+class MirrorLimiter:
+    """Per-host semaphores capping concurrent requests to each mirror"""
+
+    def __init__(self, max_per_mirror):
+        self.max_per_mirror = max_per_mirror
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def _semaphore(self, url):
+        key = mirror_key(url)
+        with self.lock:
+            semaphore = self.slots.get(key)
+            if semaphore is None:
+                semaphore = self.slots[key] = threading.BoundedSemaphore(self.max_per_mirror)
+            return semaphore
+
+    def acquire(self, url, timeout, cancel=None):
+        """Wait for a free slot on the URL's mirror, False if none freed up in time
+
+        With a cancel Event, also gives up (False) soon after it is set.
+        """
+        semaphore = self._semaphore(url)
+        if cancel is None:
+            return semaphore.acquire(timeout=timeout)
+        deadline = time.monotonic() + timeout
+        while not cancel.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if semaphore.acquire(timeout=min(remaining, CANCEL_POLL_INTERVAL)):
+                return True
+        return False
+
+    def release(self, url):
+        self._semaphore(url).release()
+
+
+# Process-wide instances shared by the fetch paths
+fetch_scheduler = FetchScheduler(FETCH_CONCURRENCY)
+mirror_limiter = MirrorLimiter(MIRROR_CONCURRENCY)
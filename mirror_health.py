@@ -0,0 +1,171 @@
+"""
+CBSE Previous Year Papers - Mirror health
+Rolling per-mirror statistics learned from every fetch, across all papers
+Mirrors are keyed by host, since that is what is actually slow or down
+Tracks latency, success rate and error classes, trips a circuit breaker on
+repeated failures and orders each paper's mirror URLs by expected cost
+"""
+
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+# Fetch outcomes / successful fetch latencies remembered per mirror
+OUTCOME_WINDOW = 100
+LATENCY_WINDOW = 100
+
+# Fewer samples than this and percentiles are not trusted yet
+MIN_LATENCY_SAMPLES = 5
+
+# Latency assumed for a mirror without enough samples (seconds)
+DEFAULT_LATENCY = 1.0
+
+# Floor for the success-rate estimate, so a bad mirror ranks last but a
+# single mirror that rarely works still gets tried
+MIN_SUCCESS_RATE = 0.05
+
+# Consecutive mirror-level failures that open the breaker, and how long it
+# stays open before requests are let through again
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN = 30.0
+
+# Error classes that say the mirror itself is unhealthy. Anything else (a 404
+# for a guessed URL, an HTML page instead of a PDF) is about one paper and
+# only lowers the success rate
+MIRROR_ERRORS = {'timeout', 'connection', 'error', 'http_429', 'http_5xx'}
+
+
+def mirror_key(url):
+    """Key a mirror URL by host"""
+    return urlsplit(url).netloc
+
+
+def classify_status(status_code):
+    """Error class for a non-200 HTTP status"""
+    if status_code >= 500:
+        return 'http_5xx'
+    return f'http_{status_code}'
+
+
+class MirrorStats:
+    """Rolling statistics and breaker state for one mirror host"""
+
+    def __init__(self):
+        self.outcomes = deque(maxlen=OUTCOME_WINDOW)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.errors = {}
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def success_rate(self):
+        """Smoothed success rate (an unknown mirror starts at 0.5)"""
+        return (sum(self.outcomes) + 1) / (len(self.outcomes) + 2)
+
+    def latency_percentile(self, percentile):
+        samples = sorted(self.latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def expected_cost(self):
+        """Expected seconds to get a PDF from this mirror: latency / success rate"""
+        latency = self.latency_percentile(50)
+        if latency is None:
+            latency = DEFAULT_LATENCY
+        return latency / max(self.success_rate(), MIN_SUCCESS_RATE)
+
+
+class MirrorHealth:
+    """Thread-safe health tracker shared by every fetch in the process"""
+
+    def __init__(self):
+        self.mirrors = {}
+        self.lock = threading.Lock()
+
+    def _stats(self, url):
+        key = mirror_key(url)
+        stats = self.mirrors.get(key)
+        if stats is None:
+            stats = self.mirrors[key] = MirrorStats()
+        return stats
+
+    def record_success(self, url, seconds):
+        """Record a successful fetch and how long it took to produce verified PDF bytes"""
+        with self.lock:
+            stats = self._stats(url)
+            stats.outcomes.append(1)
+            stats.latencies.append(seconds)
+            stats.consecutive_failures = 0
+            stats.open_until = 0.0
+
+    def record_failure(self, url, error_class):
+        """Record a failed fetch; mirror-level errors count towards the breaker"""
+        with self.lock:
+            stats = self._stats(url)
+            stats.outcomes.append(0)
+            stats.errors[error_class] = stats.errors.get(error_class, 0) + 1
+            if error_class in MIRROR_ERRORS:
+                stats.consecutive_failures += 1
+                if stats.consecutive_failures >= BREAKER_FAILURES:
+                    stats.open_until = time.monotonic() + BREAKER_COOLDOWN
+            else:
+                # The mirror answered, it's just missing this paper
+                stats.consecutive_failures = 0
+
+    def is_open(self, url):
+        """Whether the mirror's breaker is open (requests to it are skipped)
+
+        After the cooldown the breaker lets requests through again; one more
+        mirror-level failure re-opens it straight away.
+        """
+        with self.lock:
+            stats = self.mirrors.get(mirror_key(url))
+            return stats is not None and time.monotonic() < stats.open_until
+
+    def latency_percentile(self, url, percentile):
+        """Get a latency percentile (seconds) for a mirror, or None without enough samples"""
+        with self.lock:
+            stats = self.mirrors.get(mirror_key(url))
+            if stats is None:
+                return None
+            return stats.latency_percentile(percentile)
+
+    def order_candidates(self, candidates):
+        """Drop mirrors with an open breaker, order the rest by expected cost
+
+        candidates are (mirror_name, url) pairs; ties keep their given order.
+        """
+        now = time.monotonic()
+        ranked = []
+        with self.lock:
+            for index, (mirror_name, url) in enumerate(candidates):
+                stats = self.mirrors.get(mirror_key(url))
+                if stats is None:
+                    stats = MirrorStats()
+                elif now < stats.open_until:
+                    continue
+                ranked.append((stats.expected_cost(), index, (mirror_name, url)))
+        ranked.sort()
+        return [candidate for _, _, candidate in ranked]
+
+    def snapshot(self):
+        """Current statistics for every mirror seen so far"""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                key: {
+                    'attempts': len(stats.outcomes),
+                    'success_rate': round(stats.success_rate(), 4),
+                    'p50': stats.latency_percentile(50),
+                    'p90': stats.latency_percentile(90),
+                    'errors': dict(stats.errors),
+                    'breaker_open': now < stats.open_until,
+                }
+                for key, stats in self.mirrors.items()
+            }
+
+
+# Process-wide tracker shared by the fetch paths
+mirror_health = MirrorHealth()
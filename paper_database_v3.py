@@ -6,6 +6,16 @@ Includes: Question Papers, Marking Schemes, Sample Papers, Compartment Papers
 All Sets and Regions covered with maximum mirror fallbacks
 """
 
+import bisect
+import functools
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+from array import array
+
 # Enhanced verified working mirror base URLs
 MIRRORS = {
     "supercop": "https://files.supercop.in/cbse-board-papers/class12",
@@ -132,6 +142,109 @@ SAMPLE_PAPER_YEARS = {
 }
 
 
+# Number of papers whose materialized mirror URL lists are kept in memory
+URL_MEMO_SIZE = 256
+
+
+class Paper:
+    """Compact, read-only paper record with a dict-compatible accessor
+
+    Categorical values (year, subject, type, region, ...) are interned so every
+    record shares one string object per distinct value, and ``__slots__`` avoids
+    a per-record ``__dict__``. ``paper["year"]``, ``paper.get("urls")`` and
+    ``paper.items()`` keep working for code written against the old dicts.
+
+    Mirror URLs are not stored: each paper keeps a reference to the shared
+    ``url_templates`` of its subject/year/kind and ``urls`` fills them in on
+    access (see ``materialize_urls``).
+    """
+    
+    FIELDS = ("id", "year", "subject", "subject_code", "type", "series", "set",
+              "paper_code", "region", "filename", "display_name", "urls")
+    INTERNED_FIELDS = ("year", "subject", "subject_code", "type", "series", "set",
+                       "paper_code", "region")
+    
+    __slots__ = ("id", "year", "subject", "subject_code", "type", "series", "set",
+                 "paper_code", "region", "filename", "display_name", "url_templates")
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            value = fields[name]
+            if name in self.INTERNED_FIELDS:
+                value = sys.intern(value)
+            elif name == "url_templates":
+                value = tuple((sys.intern(mirror), sys.intern(template)) for mirror, template in value)
+            object.__setattr__(self, name, value)
+    
+    @property
+    def urls(self):
+        return materialize_urls(self)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Paper records are read-only")
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key, default=None):
+        if key not in self.FIELDS:
+            return default
+        return getattr(self, key)
+    
+    def __contains__(self, key):
+        return key in self.FIELDS
+    
+    def __iter__(self):
+        return iter(self.FIELDS)
+    
+    def __len__(self):
+        return len(self.FIELDS)
+    
+    def keys(self):
+        return self.FIELDS
+    
+    def values(self):
+        return [getattr(self, name) for name in self.FIELDS]
+    
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.FIELDS]
+    
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+    
+    def state(self):
+        """Stored slot values, in ``__slots__`` order"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a record from ``state()`` without re-validating or re-interning"""
+        paper = object.__new__(cls)
+        for name, value in zip(cls.__slots__, state):
+            object.__setattr__(paper, name, value)
+        return paper
+    
+    def __repr__(self):
+        return f"Paper(id={self.id!r}, display_name={self.display_name!r})"
+
+
+# Fields exposed by the API (urls stay internal)
+PUBLIC_FIELDS = tuple(name for name in Paper.FIELDS if name != "urls")
+
+
+@functools.lru_cache(maxsize=URL_MEMO_SIZE)
+def materialize_urls(paper):
+    """Fill a paper's mirror URL templates in (memoized for recently used papers)"""
+    params = {
+        "paper_code": paper.paper_code,
+        "region": paper.region.lower().replace(" ", "-"),
+        "set_num": paper.set.split()[-1],
+    }
+    return tuple((mirror, template.format(**params)) for mirror, template in paper.url_templates)
+
+
 def generate_supercop_url(subject, year, paper_code, is_marking_scheme=False):
     """Generate verified supercop.in URL"""
     config = SUBJECT_CONFIG.get(subject)
@@ -281,6 +394,19 @@ def generate_mirror_urls(subject, year, paper_code, is_marking_scheme=False, is_
     return urls
 
 
+def generate_mirror_templates(subject, year, is_marking_scheme=False):
+    """Generate mirror URL templates shared by every region/set of a subject and year
+
+    Placeholders {paper_code}, {region} and {set_num} are filled per paper by
+    ``materialize_urls``; the result is what ``generate_mirror_urls`` returns
+    for that paper.
+    """
+    return tuple(generate_mirror_urls(
+        subject, year, "{paper_code}", is_marking_scheme,
+        set_name="set-{set_num}", region="{region}", set_num="{set_num}"
+    ))
+
+
 def generate_paper_list():
     """Generate comprehensive list of all papers with verified working URLs"""
     papers = []
@@ -317,76 +443,70 @@ def generate_paper_list():
             if not (has_supercop or has_vedantu or has_selfstudy):
                 continue
             
+            # Mirror URL templates are shared by every region/set of this year
+            qp_templates = generate_mirror_templates(subject, year, False)
+            ms_templates = generate_mirror_templates(subject, year, True)
+            
             # Generate papers for all regions/sets
             for series, sets in standard_series.items():
                 region = REGION_MAP.get(series, f"Series {series}")
                 
                 for set_num in sets:
                     paper_code = f"{subject_code}-{series}-{set_num}"
-                    set_name = f"set-{set_num}"
-                    region_lower = region.lower().replace(" ", "-")
                     
                     # Question Paper with all mirrors
-                    qp_urls = generate_mirror_urls(
-                        subject, year, paper_code, False, 
-                        set_name=set_name, region=region_lower, set_num=set_num
-                    )
-                    if qp_urls:
-                        papers.append({
-                            "id": paper_id,
-                            "year": year,
-                            "subject": subject,
-                            "subject_code": subject_code,
-                            "type": "question_paper",
-                            "series": series,
-                            "set": f"Set {set_num}",
-                            "paper_code": paper_code,
-                            "region": region,
-                            "filename": f"CBSE_{year}_{subject.replace(' ', '_')}_{paper_code}_QP.pdf",
-                            "display_name": f"{subject} {year} {region} Set {set_num} - Question Paper",
-                            "urls": qp_urls,
-                        })
+                    if qp_templates:
+                        papers.append(Paper(
+                            id=paper_id,
+                            year=year,
+                            subject=subject,
+                            subject_code=subject_code,
+                            type="question_paper",
+                            series=series,
+                            set=f"Set {set_num}",
+                            paper_code=paper_code,
+                            region=region,
+                            filename=f"CBSE_{year}_{subject.replace(' ', '_')}_{paper_code}_QP.pdf",
+                            display_name=f"{subject} {year} {region} Set {set_num} - Question Paper",
+                            url_templates=qp_templates,
+                        ))
                         paper_id += 1
                     
                     # Marking Scheme with all mirrors
-                    ms_urls = generate_mirror_urls(
-                        subject, year, paper_code, True,
-                        set_name=set_name, region=region_lower, set_num=set_num
-                    )
-                    if ms_urls:
-                        papers.append({
-                            "id": paper_id,
-                            "year": year,
-                            "subject": subject,
-                            "subject_code": subject_code,
-                            "type": "marking_scheme",
-                            "series": series,
-                            "set": f"Set {set_num}",
-                            "paper_code": paper_code,
-                            "region": region,
-                            "filename": f"CBSE_{year}_{subject.replace(' ', '_')}_{paper_code}_MS.pdf",
-                            "display_name": f"{subject} {year} {region} Set {set_num} - Marking Scheme",
-                            "urls": ms_urls,
-                        })
+                    if ms_templates:
+                        papers.append(Paper(
+                            id=paper_id,
+                            year=year,
+                            subject=subject,
+                            subject_code=subject_code,
+                            type="marking_scheme",
+                            series=series,
+                            set=f"Set {set_num}",
+                            paper_code=paper_code,
+                            region=region,
+                            filename=f"CBSE_{year}_{subject.replace(' ', '_')}_{paper_code}_MS.pdf",
+                            display_name=f"{subject} {year} {region} Set {set_num} - Marking Scheme",
+                            url_templates=ms_templates,
+                        ))
                         paper_id += 1
             
             # Compartment papers (separate series)
             comp_urls = generate_compartment_urls(subject, year)
             if comp_urls:
-                papers.append({
-                    "id": paper_id,
-                    "year": year,
-                    "subject": subject,
-                    "subject_code": subject_code,
-                    "type": "compartment",
-                    "series": "C",
-                    "set": "Compartment",
-                    "paper_code": f"{subject_code}-C-1",
-                    "region": "Compartment",
-                    "filename": f"CBSE_{year}_{subject.replace(' ', '_')}_Compartment_QP.pdf",
-                    "display_name": f"{subject} {year} Compartment - Question Paper",
-                    "urls": comp_urls,
-                })
+                papers.append(Paper(
+                    id=paper_id,
+                    year=year,
+                    subject=subject,
+                    subject_code=subject_code,
+                    type="compartment",
+                    series="C",
+                    set="Compartment",
+                    paper_code=f"{subject_code}-C-1",
+                    region="Compartment",
+                    filename=f"CBSE_{year}_{subject.replace(' ', '_')}_Compartment_QP.pdf",
+                    display_name=f"{subject} {year} Compartment - Question Paper",
+                    url_templates=comp_urls,
+                ))
                 paper_id += 1
     
     # Sample Papers (from CBSE Academic)
@@ -403,46 +523,324 @@ def generate_paper_list():
             # Sample Question Paper
             sqp_urls = generate_mirror_urls(subject, year, f"{subject_code}-SQP", False, False, True, year_session)
             if sqp_urls:
-                papers.append({
-                    "id": paper_id,
-                    "year": year,
-                    "subject": subject,
-                    "subject_code": subject_code,
-                    "type": "sample_paper",
-                    "series": "SQP",
-                    "set": "Sample",
-                    "paper_code": f"{subject_code}-SQP",
-                    "region": "Sample Paper",
-                    "filename": f"CBSE_{year_session}_{subject.replace(' ', '_')}_Sample_Paper.pdf",
-                    "display_name": f"{subject} {year_session} - Sample Question Paper",
-                    "urls": sqp_urls,
-                })
+                papers.append(Paper(
+                    id=paper_id,
+                    year=year,
+                    subject=subject,
+                    subject_code=subject_code,
+                    type="sample_paper",
+                    series="SQP",
+                    set="Sample",
+                    paper_code=f"{subject_code}-SQP",
+                    region="Sample Paper",
+                    filename=f"CBSE_{year_session}_{subject.replace(' ', '_')}_Sample_Paper.pdf",
+                    display_name=f"{subject} {year_session} - Sample Question Paper",
+                    url_templates=sqp_urls,
+                ))
                 paper_id += 1
             
             # Sample Marking Scheme
             sms_urls = generate_mirror_urls(subject, year, f"{subject_code}-SQP", True, False, True, year_session)
             if sms_urls:
-                papers.append({
-                    "id": paper_id,
-                    "year": year,
-                    "subject": subject,
-                    "subject_code": subject_code,
-                    "type": "sample_paper",
-                    "series": "SQP",
-                    "set": "Sample MS",
-                    "paper_code": f"{subject_code}-SQP",
-                    "region": "Sample Paper",
-                    "filename": f"CBSE_{year_session}_{subject.replace(' ', '_')}_Sample_MS.pdf",
-                    "display_name": f"{subject} {year_session} - Sample Marking Scheme",
-                    "urls": sms_urls,
-                })
+                papers.append(Paper(
+                    id=paper_id,
+                    year=year,
+                    subject=subject,
+                    subject_code=subject_code,
+                    type="sample_paper",
+                    series="SQP",
+                    set="Sample MS",
+                    paper_code=f"{subject_code}-SQP",
+                    region="Sample Paper",
+                    filename=f"CBSE_{year_session}_{subject.replace(' ', '_')}_Sample_MS.pdf",
+                    display_name=f"{subject} {year_session} - Sample Marking Scheme",
+                    url_templates=sms_urls,
+                ))
                 paper_id += 1
     
     return papers
 
 
-# Pre-generate the paper list
-ALL_PAPERS = generate_paper_list()
+# Fields that get an inverted index (posting lists of catalog positions)
+INDEXED_FIELDS = ["year", "subject", "type", "region"]
+
+
+def build_paper_index(papers):
+    """Build posting lists per indexed field value
+
+    Each posting is a (positions, position_set) pair: positions is the ascending
+    tuple of indexes into ``papers`` (catalog order), position_set the same
+    positions as a frozenset for O(1) membership tests during intersection.
+    """
+    buckets = {field: {} for field in INDEXED_FIELDS}
+    for pos, paper in enumerate(papers):
+        for field in INDEXED_FIELDS:
+            buckets[field].setdefault(paper[field], []).append(pos)
+    
+    index = {}
+    for field, values in buckets.items():
+        index[field] = {
+            value: (tuple(positions), frozenset(positions))
+            for value, positions in values.items()
+        }
+    return index
+
+
+# Search index: fields that are tokenized, with their ranking weight
+SEARCH_FIELD_WEIGHTS = {
+    "subject": 4,
+    "year": 4,
+    "type": 3,
+    "paper_code": 3,
+    "region": 3,
+    "display_name": 1,
+}
+
+# Extra search tokens for field values, indexed with that field's weight
+SEARCH_ALIASES = {
+    "Mathematics": ["maths", "math"],
+    "Accountancy": ["accounts", "accounting"],
+    "Economics": ["eco", "econ"],
+    "Business Studies": ["bst", "bs"],
+    "English Core": ["english"],
+    "Data Science": ["ds"],
+    "question_paper": ["qp"],
+    "marking_scheme": ["ms", "answers"],
+    "sample_paper": ["sqp"],
+    "compartment": ["supplementary"],
+}
+
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Rank multiplier for a query term that is only a prefix of the indexed token
+SEARCH_PREFIX_FACTOR = 0.5
+
+# Number of distinct search queries whose ranked results are memoized
+SEARCH_MEMO_SIZE = 512
+
+
+def paper_search_tokens(paper):
+    """Get {token: weight} for a paper, keeping the best weight per token"""
+    tokens = {}
+    for field, weight in SEARCH_FIELD_WEIGHTS.items():
+        value = paper[field]
+        field_tokens = set(SEARCH_TOKEN_RE.findall(value.lower()))
+        field_tokens.update(SEARCH_ALIASES.get(value, []))
+        if field == "paper_code":
+            field_tokens.add(value.lower())
+        for token in field_tokens:
+            if weight > tokens.get(token, 0):
+                tokens[token] = weight
+    return tokens
+
+
+def build_search_index(papers):
+    """Build the token index used by search
+
+    Returns (tokens, postings): tokens is the sorted tuple of every indexed
+    token, so all tokens sharing a prefix form one contiguous bisect range,
+    and postings maps each token to parallel arrays (catalog positions,
+    weights) in catalog order. Arrays keep the index a fraction of the size
+    of per-token dicts.
+    """
+    position_type = "H" if len(papers) <= 0xFFFF else "I"
+    postings = {}
+    for pos, paper in enumerate(papers):
+        for token, weight in paper_search_tokens(paper).items():
+            posting = postings.get(token)
+            if posting is None:
+                posting = postings[token] = (array(position_type), array("B"))
+            posting[0].append(pos)
+            posting[1].append(weight)
+    return tuple(sorted(postings)), postings
+
+
+def search_terms(query):
+    """Split a search query into lowercase terms
+
+    Whitespace separates terms. A term that is not a prefix of any indexed
+    token as a whole (e.g. "maths-2023") is split into its alphanumeric parts;
+    one that is (e.g. the paper code "65-1") is kept whole.
+    """
+    tokens = SEARCH_INDEX[0]
+    terms = []
+    for chunk in query.lower().split():
+        start = bisect.bisect_left(tokens, chunk)
+        if start < len(tokens) and tokens[start].startswith(chunk):
+            terms.append(chunk)
+        else:
+            terms.extend(SEARCH_TOKEN_RE.findall(chunk))
+    return terms
+
+
+def score_search_term(term):
+    """Get {catalog position: score} for papers with a token starting with term"""
+    tokens, postings = SEARCH_INDEX
+    scores = {}
+    start = bisect.bisect_left(tokens, term)
+    for token in tokens[start:]:
+        if not token.startswith(term):
+            break
+        factor = 1.0 if token == term else SEARCH_PREFIX_FACTOR
+        for pos, weight in zip(*postings[token]):
+            score = weight * factor
+            if score > scores.get(pos, 0):
+                scores[pos] = score
+    return scores
+
+
+@functools.lru_cache(maxsize=SEARCH_MEMO_SIZE)
+def ranked_search(query):
+    """Rank catalog positions matching every term of a search query
+
+    Every term has to match (as a whole token or a token prefix, so the last
+    word of a search-as-you-type query already matches). Papers are ranked by
+    the summed score of their best token per term, ties keep catalog order.
+    A query with no searchable terms (e.g. "!!!") matches nothing.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return ()
+    
+    term_scores = sorted((score_search_term(term) for term in terms), key=len)
+    totals = dict(term_scores[0])
+    for scores in term_scores[1:]:
+        totals = {pos: total + scores[pos] for pos, total in totals.items() if pos in scores}
+        if not totals:
+            break
+    return tuple(sorted(totals, key=lambda pos: (-totals[pos], pos)))
+
+
+def summarize_catalog(papers, index):
+    """Compute filter options and stats for a catalog from its posting lists"""
+    filter_options = {
+        "years": sorted(index["year"], reverse=True),
+        "subjects": SUBJECTS,
+        "types": PAPER_TYPES,
+        "regions": sorted(index["region"]),
+    }
+    stats = {
+        "total": len(papers),
+        "by_subject": {value: len(posting[0]) for value, posting in index["subject"].items()},
+        "by_year": {value: len(posting[0]) for value, posting in index["year"].items()},
+        "by_type": {value: len(posting[0]) for value, posting in index["type"].items()},
+    }
+    return filter_options, stats
+
+
+def compute_catalog_version(papers):
+    """Content hash of the catalog, changes whenever any paper entry changes"""
+    digest = hashlib.sha1()
+    for paper in papers:
+        digest.update(json.dumps(paper.state()).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def load_catalog(papers, index=None, search_index=None, version=None):
+    """Install a paper list and rebuild every structure derived from it
+
+    Indexes and aggregates are only ever rebuilt here, so read paths never
+    have to recompute them per request. Prebuilt indexes and version (from a
+    snapshot) can be passed in to skip recomputing them.
+    """
+    global ALL_PAPERS, PAPER_INDEX, SEARCH_INDEX, PAPERS_BY_ID, POSITIONS_BY_ID
+    global FILTER_OPTIONS, STATS, CATALOG_VERSION
+    
+    if index is None:
+        index = build_paper_index(papers)
+    if search_index is None:
+        search_index = build_search_index(papers)
+    if version is None:
+        version = compute_catalog_version(papers)
+    filter_options, stats = summarize_catalog(papers, index)
+    
+    ALL_PAPERS = papers
+    PAPER_INDEX = index
+    SEARCH_INDEX = search_index
+    PAPERS_BY_ID = {paper["id"]: paper for paper in papers}
+    POSITIONS_BY_ID = {paper["id"]: pos for pos, paper in enumerate(papers)}
+    FILTER_OPTIONS = filter_options
+    STATS = stats
+    CATALOG_VERSION = version
+    materialize_urls.cache_clear()
+    ranked_search.cache_clear()
+
+
+# Catalog snapshot: prebuilt papers + index, written at build time so workers
+# don't have to regenerate the catalog on every start
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_PATH = os.environ.get(
+    "CATALOG_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog_snapshot.pickle")
+)
+
+
+def compute_config_fingerprint():
+    """Hash of everything the generated catalog depends on
+
+    Covers this module's source as well as its config tables, so a change to
+    the generation code itself also invalidates old snapshots.
+    """
+    config = [SNAPSHOT_FORMAT, MIRRORS, SUBJECT_CONFIG, YEARS, PAPER_TYPES,
+              REGION_MAP, SETS, SAMPLE_PAPER_YEARS, list(Paper.__slots__)]
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8"))
+    with open(__file__, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def write_catalog_snapshot(path=SNAPSHOT_PATH):
+    """Write the loaded catalog and its index to a binary snapshot file
+
+    Only builtin and array types are pickled (records as ``Paper.state()``
+    tuples), and the file is written to a temp name and renamed so readers
+    never see a partial snapshot.
+    """
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "fingerprint": compute_config_fingerprint(),
+        "version": CATALOG_VERSION,
+        "records": tuple(paper.state() for paper in ALL_PAPERS),
+        "index": PAPER_INDEX,
+        "search_index": SEARCH_INDEX,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_catalog_snapshot(path=SNAPSHOT_PATH):
+    """Read a catalog snapshot, or None if it is missing, unreadable or stale"""
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception:
+        return None
+    
+    if not isinstance(snapshot, dict):
+        return None
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if snapshot.get("fingerprint") != compute_config_fingerprint():
+        return None
+    return snapshot
+
+
+def load_catalog_snapshot(path=SNAPSHOT_PATH):
+    """Load the catalog from a snapshot, returns False if none was usable"""
+    snapshot = read_catalog_snapshot(path)
+    if snapshot is None:
+        return False
+    papers = [Paper.from_state(state) for state in snapshot["records"]]
+    load_catalog(papers, index=snapshot["index"], search_index=snapshot["search_index"],
+                 version=snapshot["version"])
+    return True
+
+
+# Load the prebuilt snapshot, or generate the paper list if it is missing/stale
+if not load_catalog_snapshot():
+    load_catalog(generate_paper_list())
 
 
 def get_all_papers():
@@ -452,45 +850,164 @@ def get_all_papers():
 
 def get_paper_by_id(paper_id):
     """Get a specific paper by ID"""
-    for paper in ALL_PAPERS:
-        if paper["id"] == paper_id:
-            return paper
-    return None
-
-
-def filter_papers(year=None, subject=None, paper_type=None, region=None, search=None):
-    """Filter papers based on criteria"""
-    papers = ALL_PAPERS.copy()
-    
-    if year:
-        papers = [p for p in papers if p["year"] == year]
-    if subject:
-        papers = [p for p in papers if p["subject"] == subject]
-    if paper_type:
-        papers = [p for p in papers if p["type"] == paper_type]
-    if region:
-        papers = [p for p in papers if p["region"] == region]
+    return PAPERS_BY_ID.get(paper_id)
+
+
+def get_papers_by_ids(paper_ids):
+    """Resolve a list of paper IDs in one call
+
+    Returns (papers, missing_ids): papers in the order requested, and the IDs
+    that are not in the catalog.
+    """
+    papers = []
+    missing_ids = []
+    for paper_id in paper_ids:
+        paper = PAPERS_BY_ID.get(paper_id)
+        if paper is None:
+            missing_ids.append(paper_id)
+        else:
+            papers.append(paper)
+    return papers, missing_ids
+
+
+def match_positions(criteria):
+    """Intersect posting lists for {field: value} criteria
+
+    Walks the shortest posting list and probes the others, so the cost is
+    bounded by the most selective filter rather than the catalog size.
+    Returns catalog positions in catalog order, or None when no criteria apply.
+    """
+    postings = []
+    for field, value in criteria.items():
+        if not value:
+            continue
+        posting = PAPER_INDEX[field].get(value)
+        if posting is None:
+            return []
+        postings.append(posting)
+    
+    if not postings:
+        return None
+    
+    postings.sort(key=lambda posting: len(posting[0]))
+    positions, _ = postings[0]
+    others = [position_set for _, position_set in postings[1:]]
+    return [pos for pos in positions if all(pos in other for other in others)]
+
+
+def match_search(search, positions=None):
+    """Narrow catalog positions (all when None) to ranked search matches
+
+    Returns positions in rank order; none when the search has no
+    searchable terms.
+    """
+    ranked = ranked_search(" ".join(search.lower().split()))
+    if positions is None:
+        return list(ranked)
+    allowed = set(positions)
+    return [pos for pos in ranked if pos in allowed]
+
+
+def filter_positions(year=None, subject=None, paper_type=None, region=None, search=None,
+                     unavailable=None, unavailable_mode="last"):
+    """Filter papers based on criteria, returning catalog positions
+
+    Lets callers page through a result without materializing every paper.
+    Positions come back in the same order ``filter_papers`` would use.
+    unavailable is a set of paper IDs known to be on no mirror; with
+    unavailable_mode "last" they are moved after the others (keeping their
+    relative order), with "hide" they are dropped.
+    """
+    positions = match_positions({
+        "year": year,
+        "subject": subject,
+        "type": paper_type,
+        "region": region,
+    })
     if search:
-        search_lower = search.lower()
-        papers = [p for p in papers if (
-            search_lower in p["display_name"].lower() or 
-            search_lower in p.get("paper_code", "").lower() or
-            search_lower in p.get("subject", "").lower()
-        )]
+        positions = match_search(search, positions)
     
-    return papers
+    if positions is None:
+        positions = range(len(ALL_PAPERS))
+    if unavailable:
+        dead = {POSITIONS_BY_ID[pid] for pid in unavailable if pid in POSITIONS_BY_ID}
+        live = [pos for pos in positions if pos not in dead]
+        if unavailable_mode == "hide":
+            return live
+        return live + [pos for pos in positions if pos in dead]
+    return positions
 
 
-def get_filter_options():
-    """Get available filter options"""
-    regions = sorted(list(set(p["region"] for p in ALL_PAPERS)))
-    years = sorted(list(set(p["year"] for p in ALL_PAPERS)), reverse=True)
-    return {
-        "years": years,
-        "subjects": SUBJECTS,
-        "types": PAPER_TYPES,
-        "regions": regions
+def filter_papers(year=None, subject=None, paper_type=None, region=None, search=None,
+                  unavailable=None, unavailable_mode="last"):
+    """Filter papers based on criteria (see filter_positions for unavailable)"""
+    positions = filter_positions(year=year, subject=subject, paper_type=paper_type,
+                                 region=region, search=search, unavailable=unavailable,
+                                 unavailable_mode=unavailable_mode)
+    return [ALL_PAPERS[pos] for pos in positions]
+
+
+def get_papers_at(positions):
+    """Get the papers at the given catalog positions"""
+    return [ALL_PAPERS[pos] for pos in positions]
+
+
+def offset_after(positions, paper_id):
+    """Get the offset in a filter result just past a paper (keyset cursor)
+
+    Returns None if the paper is not part of the result.
+    """
+    pos = POSITIONS_BY_ID.get(paper_id)
+    if pos is None:
+        return None
+    try:
+        return positions.index(pos) + 1
+    except ValueError:
+        return None
+
+
+def get_facet_counts(year=None, subject=None, paper_type=None, region=None, search=None):
+    """Count matching papers per value of each indexed field
+
+    Each field is counted against the selection made by all *other* filters,
+    so e.g. the year counts answer "how many papers would each year have
+    given the chosen subject and type". Counts are intersections of posting
+    lists rather than passes over the catalog.
+    """
+    criteria = {
+        "year": year,
+        "subject": subject,
+        "type": paper_type,
+        "region": region,
     }
+    search_set = None
+    if search:
+        search_set = frozenset(match_search(search))
+    
+    facets = {}
+    for field in INDEXED_FIELDS:
+        others = {key: value for key, value in criteria.items() if key != field}
+        positions = match_positions(others)
+        if positions is None:
+            selection = search_set
+        else:
+            selection = set(positions)
+            if search_set is not None:
+                selection &= search_set
+        
+        counts = {}
+        for value, (value_positions, value_set) in PAPER_INDEX[field].items():
+            if selection is None:
+                counts[value] = len(value_positions)
+            else:
+                counts[value] = len(value_set & selection)
+        facets[field] = counts
+    return facets
+
+
+def get_filter_options():
+    """Get available filter options (precomputed, do not mutate)"""
+    return FILTER_OPTIONS
 
 
 def get_paper_count():
@@ -499,31 +1016,23 @@ def get_paper_count():
 
 
 def get_stats():
-    """Get detailed statistics"""
-    stats = {
-        "total": len(ALL_PAPERS),
-        "by_subject": {},
-        "by_year": {},
-        "by_type": {},
-    }
-    
-    for paper in ALL_PAPERS:
-        # By subject
-        subj = paper["subject"]
-        stats["by_subject"][subj] = stats["by_subject"].get(subj, 0) + 1
-        
-        # By year
-        yr = paper["year"]
-        stats["by_year"][yr] = stats["by_year"].get(yr, 0) + 1
-        
-        # By type
-        typ = paper["type"]
-        stats["by_type"][typ] = stats["by_type"].get(typ, 0) + 1
-    
-    return stats
+    """Get detailed statistics (precomputed, do not mutate)"""
+    return STATS
+
+
+def get_catalog_version():
+    """Get the version hash of the currently loaded catalog"""
+    return CATALOG_VERSION
 
 
 if __name__ == "__main__":
+    if "--build-snapshot" in sys.argv:
+        # Always regenerate, never re-save whatever snapshot was just loaded
+        load_catalog(generate_paper_list())
+        write_catalog_snapshot()
+        print(f"Wrote catalog snapshot {CATALOG_VERSION} ({len(ALL_PAPERS)} papers) to {SNAPSHOT_PATH}")
+        sys.exit(0)
+    
     stats = get_stats()
     print(f"Total papers in database: {stats['total']}")
     print(f"Subjects: {SUBJECTS}")
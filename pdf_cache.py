@@ -0,0 +1,274 @@
+"""
+CBSE Previous Year Papers - PDF content cache
+Keeps fetched paper PDFs on local disk so repeat downloads skip the mirrors
+Shared by every gunicorn worker: writes are atomic renames, LRU order is file mtime
+The most requested PDFs are additionally held in a per-process memory cache
+"""
+
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Cache location and size cap (bytes); a cap of 0 disables the disk cache
+PDF_CACHE_DIR = os.environ.get(
+    'PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'cbse-papers-pdf-cache')
+)
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Per-process memory cache budget (bytes, 0 disables) and largest single PDF it
+# will hold, so one huge file can't flush every hot paper at once
+PDF_MEMORY_CACHE_BYTES = int(os.environ.get('PDF_MEMORY_CACHE_BYTES', 64 * 1024 * 1024))
+PDF_MEMORY_CACHE_MAX_ENTRY = int(os.environ.get('PDF_MEMORY_CACHE_MAX_ENTRY', PDF_MEMORY_CACHE_BYTES // 8))
+
+# Temp files older than this are leftovers from a crashed writer
+STALE_TEMP_SECONDS = 3600
+
+# Characters allowed in cache file names
+UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def paper_cache_key(paper):
+    """Cache key for a paper: its filename, which is stable across catalog rebuilds"""
+    return paper['filename']
+
+
+class DiskPDFCache:
+    """Size-bounded on-disk PDF store with LRU eviction
+
+    Entries are plain files named after the cache key. A write goes to a
+    hidden temp file in the same directory and is renamed into place, so
+    readers in any process only ever see complete PDFs. Reads bump the
+    file's mtime, and eviction removes the least recently used files until
+    the directory is back under max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        if self.enabled:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                # No writable cache directory: run uncached rather than fail
+                self.max_bytes = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def path_for(self, key):
+        return os.path.join(self.directory, UNSAFE_NAME_CHARS.sub('_', key))
+
+    def get_path(self, key):
+        """Get the file path of a cached entry (marking it as used), or None"""
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def contains(self, key):
+        """Whether an entry exists, without marking it as used"""
+        return self.enabled and os.path.exists(self.path_for(key))
+
+    def get(self, key):
+        """Get cached PDF bytes, or None"""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted by another worker between the lookup and the read
+            return None
+
+    def put(self, key, content):
+        """Store PDF bytes (best effort: a full or read-only disk is not an error)"""
+        writer = self.open_writer(key)
+        if writer is None:
+            return
+        try:
+            writer.write(content)
+            writer.commit()
+        except OSError:
+            writer.discard()
+
+    def open_writer(self, key):
+        """Start an incremental write (used to tee a streamed download), or None"""
+        if not self.enabled:
+            return None
+        try:
+            return CacheWriter(self, key)
+        except OSError:
+            return None
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        now = time.time()
+        try:
+            scan = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in scan:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.startswith('.'):
+                if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                    self._remove(entry.path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class CacheWriter:
+    """Incremental write of one cache entry; nothing is visible until commit()"""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.path = cache.path_for(key)
+        fd, self.temp_path = tempfile.mkstemp(
+            dir=cache.directory, prefix=f'.{os.path.basename(self.path)}.', suffix='.tmp'
+        )
+        self.file = os.fdopen(fd, 'wb')
+        self.size = 0
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def flush(self):
+        """Make everything written so far readable through the temp file"""
+        self.file.flush()
+
+    def commit(self):
+        """Publish the entry atomically, then evict if the cache is over its cap"""
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+        with self.cache.lock:
+            self.cache.evict()
+
+    def discard(self):
+        """Drop a partial write (e.g. the mirror or the client went away)"""
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        self.cache._remove(self.temp_path)
+
+
+class MemoryPDFCache:
+    """Per-process LRU of PDF bytes bounded by total size, not entry count
+
+    Inserting evicts least recently used entries until the new one fits the
+    byte budget; entries larger than max_entry_bytes are never kept. Each
+    entry can carry its content hash, which goes away with the entry.
+    """
+
+    def __init__(self, max_bytes, max_entry_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.entries = OrderedDict()
+        self.hashes = {}
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Get cached PDF bytes (counting a hit or miss), or None"""
+        with self.lock:
+            content = self.entries.get(key)
+            if content is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return content
+
+    def peek(self, key):
+        """Get cached PDF bytes without counting a lookup or marking them used, or None"""
+        with self.lock:
+            return self.entries.get(key)
+
+    def fits(self, size):
+        """Whether an entry of this size would be kept at all"""
+        return 0 < size <= self.max_entry_bytes
+
+    def content_hash(self, key, content):
+        """Hash recorded for an entry, None if unknown or content isn't the cached object"""
+        with self.lock:
+            if self.entries.get(key) is content:
+                return self.hashes.get(key)
+            return None
+
+    def set_content_hash(self, key, content, content_hash):
+        """Record an entry's hash, if content is still the cached object"""
+        with self.lock:
+            if self.entries.get(key) is content:
+                self.hashes[key] = content_hash
+
+    def put(self, key, content, content_hash=None):
+        """Store PDF bytes, evicting least recently used entries to make room"""
+        size = len(content)
+        if not self.fits(size):
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+                self.hashes.pop(key, None)
+            while self.entries and self.total_bytes + size > self.max_bytes:
+                evicted_key, evicted = self.entries.popitem(last=False)
+                self.hashes.pop(evicted_key, None)
+                self.total_bytes -= len(evicted)
+                self.evictions += 1
+            self.entries[key] = content
+            if content_hash is not None:
+                self.hashes[key] = content_hash
+            self.total_bytes += size
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# Process-wide cache instances shared by the fetch paths
+pdf_cache = DiskPDFCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)
+memory_cache = MemoryPDFCache(PDF_MEMORY_CACHE_BYTES, PDF_MEMORY_CACHE_MAX_ENTRY)
@@ -0,0 +1,817 @@
+"""
+CBSE Previous Year Papers - Mirror fetching
+Fetches paper PDFs from the mirror sites with fallback across mirrors
+Connections are pooled per mirror and reused across requests (keep-alive)
+Fetched PDFs are read through the memory and shared on-disk caches (pdf_cache.py)
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import time
+import threading
+import functools
+import concurrent.futures
+import requests
+from requests.adapters import HTTPAdapter
+from pdf_cache import pdf_cache, memory_cache, paper_cache_key, PDF_CACHE_DIR
+from mirror_health import mirror_health, classify_status
+from fetch_scheduler import fetch_scheduler, mirror_limiter, FETCH_CONCURRENCY
+from availability_index import availability_index
+
+# Different headers for different mirrors
+HEADERS_SUPERCOP = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/pdf,*/*',
+    'Referer': 'https://supercop.in/',
+}
+
+HEADERS_SELFSTUDY = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/pdf,*/*',
+    'Referer': 'https://www.selfstudys.com/',
+}
+
+HEADERS_CBSE = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/pdf,*/*',
+    'Referer': 'https://cbse.gov.in/',
+}
+
+HEADERS_AGLASEM = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/pdf,*/*',
+    'Referer': 'https://schools.aglasem.com/',
+}
+
+HEADERS_EXAMFEAR = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/pdf,*/*',
+    'Referer': 'https://www.examfear.com/',
+}
+
+MIRROR_HEADERS = {
+    'supercop': HEADERS_SUPERCOP,
+    'selfstudy': HEADERS_SELFSTUDY,
+    'aglasem': HEADERS_AGLASEM,
+    'examfear': HEADERS_EXAMFEAR,
+    'cbse': HEADERS_CBSE,
+}
+
+# Papers a batch (zip) request has in progress or waiting to be consumed at
+# once; also the per-mirror pool size, so a batch against a single mirror never
+# has to open throwaway connections. The fetches themselves run on the shared
+# fetch_scheduler, capped process-wide and per mirror
+FETCH_WORKERS = 10
+
+# Bytes read from upstream per chunk when streaming a download through
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Distinct hosts kept in each mirror session's pool (e.g. vedantu and
+# cbseacademic share the default header group but are separate hosts)
+POOL_HOSTS = 4
+
+# Hedged requests: when the current mirror has not produced verified PDF
+# bytes within its observed p90 latency (clamped to the bounds below, default
+# until enough samples exist), the next mirror is started in parallel and the
+# first valid PDF wins
+HEDGE_REQUESTS = True
+HEDGE_PERCENTILE = 90
+HEDGE_DEFAULT_DELAY = 2.0
+HEDGE_MIN_DELAY = 0.25
+HEDGE_MAX_DELAY = 8.0
+
+# Most mirror URLs a catalog paper lists, i.e. the most attempts one hedged
+# fetch can have in flight
+MAX_CANDIDATES = 4
+
+# Threads running hedged mirror attempts: enough for every fetch the
+# scheduler runs at once to have all of its attempts in flight, so an attempt
+# never sits in the executor queue while its hedge timer runs
+HEDGE_WORKERS = FETCH_CONCURRENCY * MAX_CANDIDATES
+hedge_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=HEDGE_WORKERS, thread_name_prefix='hedge'
+)
+
+# Attempt errors meaning the mirror answered but doesn't have the paper; a
+# fetch where every mirror failed this way marks the paper unavailable
+MISSING_ERRORS = {'http_404', 'http_410', 'not_pdf'}
+
+# Cache for successful URLs: paper cache key -> (url, mirror_name)
+url_cache = {}
+
+# Winning mirrors persisted by the cache warm-up (warm_cache.py) and picked up
+# by every worker, at startup and whenever the file changes (the warm-up runs
+# after deploys, while workers are up); kept beside the PDF cache, not in it,
+# so eviction never touches it
+URL_CACHE_PATH = os.environ.get('URL_CACHE_PATH', os.path.normpath(PDF_CACHE_DIR) + '.mirrors.json')
+url_cache_mtime = None
+
+# Content hashes (ETags) of disk cache files, by paper cache key:
+# key -> (file identity, hash). The identity (see file_identity) changes when
+# any worker replaces the file, so a re-fetch never keeps a stale hash;
+# memory cache entries carry their own hash
+content_hashes = {}
+
+# Upstream fetches in progress, by paper cache key (see PaperFetch)
+inflight = {}
+inflight_lock = threading.Lock()
+
+# Keep-alive sessions, one per mirror group
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+def get_mirror_group(mirror_name):
+    """Get the mirror group (header set and session) a mirror belongs to"""
+    if 'supercop' in mirror_name:
+        return 'supercop'
+    elif 'selfstudy' in mirror_name:
+        return 'selfstudy'
+    elif 'aglasem' in mirror_name:
+        return 'aglasem'
+    elif 'examfear' in mirror_name:
+        return 'examfear'
+    else:
+        return 'cbse'
+
+
+def get_headers_for_mirror(mirror_name):
+    """Get appropriate headers for each mirror"""
+    return MIRROR_HEADERS[get_mirror_group(mirror_name)]
+
+
+def get_session(mirror_name):
+    """Get the shared keep-alive session for a mirror
+
+    Sessions are created once per mirror group with that group's headers as
+    defaults. Their connection pools are sized to FETCH_WORKERS; the
+    underlying urllib3 pools are thread-safe, so worker threads share them.
+    """
+    group = get_mirror_group(mirror_name)
+    session = sessions.get(group)
+    if session is not None:
+        return session
+
+    with sessions_lock:
+        session = sessions.get(group)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(MIRROR_HEADERS[group])
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=FETCH_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            sessions[group] = session
+    return session
+
+
+def classify_exception(error):
+    """Error class for a failed request, as tracked by mirror_health"""
+    if isinstance(error, requests.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.ConnectionError):
+        return 'connection'
+    return 'error'
+
+
+def open_pdf_stream_from_url(url, mirror_name, timeout=15, errors=None, cancel=None):
+    """Start a streaming fetch from a single URL
+
+    Reads just enough of the body to check the %PDF magic. Returns
+    (first_bytes, chunks, response) so the caller can forward the rest as it
+    arrives, or None if the mirror failed or did not send a PDF; the error
+    class is then appended to errors, if given. The caller must finish with
+    close_attempt(), which frees the mirror slot. Setting the cancel Event
+    (another mirror won) stops the wait for a slot and closes the response
+    as soon as the request returns.
+    """
+    def failed(error_class):
+        if errors is not None:
+            errors.append(error_class)
+        return None
+
+    # A mirror already at its concurrency cap counts as too slow, not as failed
+    if not mirror_limiter.acquire(url, timeout, cancel):
+        return failed('cancelled' if cancel is not None and cancel.is_set() else 'busy')
+    started = time.monotonic()
+    try:
+        response = get_session(mirror_name).get(url, timeout=timeout, allow_redirects=True, stream=True)
+    except requests.RequestException as e:
+        mirror_limiter.release(url)
+        mirror_health.record_failure(url, classify_exception(e))
+        return failed(classify_exception(e))
+
+    if cancel is not None and cancel.is_set():
+        close_attempt(url, response)
+        return failed('cancelled')
+
+    if response.status_code != 200:
+        mirror_health.record_failure(url, classify_status(response.status_code))
+        close_attempt(url, response)
+        return failed(classify_status(response.status_code))
+
+    chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+    first_bytes = b''
+    try:
+        for chunk in chunks:
+            first_bytes += chunk
+            if len(first_bytes) >= 4:
+                break
+    except requests.RequestException as e:
+        mirror_health.record_failure(url, classify_exception(e))
+        close_attempt(url, response)
+        return failed(classify_exception(e))
+
+    if first_bytes[:4] != b'%PDF':
+        mirror_health.record_failure(url, 'not_pdf')
+        close_attempt(url, response)
+        return failed('not_pdf')
+    mirror_health.record_success(url, time.monotonic() - started)
+    return first_bytes, chunks, response
+
+
+def close_attempt(url, response):
+    """Close a mirror response and free its slot in mirror_limiter"""
+    response.close()
+    mirror_limiter.release(url)
+
+
+def hedge_delay(url):
+    """How long to give a mirror before hedging with the next one"""
+    latency = mirror_health.latency_percentile(url, HEDGE_PERCENTILE)
+    if latency is None:
+        return HEDGE_DEFAULT_DELAY
+    return min(max(latency, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+
+def close_losing_attempt(url, future):
+    """Close a mirror attempt that finished after another mirror already won"""
+    if future.cancelled():
+        return
+    opened = future.result()
+    if opened is not None:
+        close_attempt(url, opened[2])
+
+
+def open_pdf_stream_hedged(candidates, errors=None):
+    """Race mirrors in order, starting the next one when the current is slow
+
+    A mirror that fails is replaced by the next one immediately (like the
+    serial fallback); one that is merely slow gets hedge_delay() before the
+    next one starts alongside it. The first verified PDF stream wins and the
+    other attempts are cancelled: those not started yet never run, the rest
+    give up waiting for a mirror slot and are closed as soon as they return.
+    Returns (mirror_name, url, opened) or None if every mirror failed, in
+    which case errors (if given) has each attempt's error class.
+    """
+    remaining = list(candidates)
+    pending = {}
+    winner = None
+    last_url = None
+    cancel = threading.Event()
+
+    def launch():
+        nonlocal last_url
+        mirror_name, url = remaining.pop(0)
+        future = hedge_executor.submit(open_pdf_stream_from_url, url, mirror_name, errors=errors, cancel=cancel)
+        pending[future] = (mirror_name, url)
+        last_url = url
+
+    try:
+        if remaining:
+            launch()
+        while pending and winner is None:
+            timeout = hedge_delay(last_url) if remaining else None
+            done, _ = concurrent.futures.wait(
+                pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                mirror_name, url = pending.pop(future)
+                opened = future.result()
+                if opened is None:
+                    continue
+                if winner is None:
+                    winner = (mirror_name, url, opened)
+                else:
+                    close_attempt(url, opened[2])
+            # Slow (nothing done) or failed (done without a winner): next mirror
+            if winner is None and remaining:
+                launch()
+    finally:
+        cancel.set()
+        for future, (_, url) in pending.items():
+            future.cancel()
+            future.add_done_callback(functools.partial(close_losing_attempt, url))
+    return winner
+
+
+def open_pdf_stream_serial(candidates, errors=None):
+    """Try mirrors strictly one after another, returns (mirror_name, url, opened) or None"""
+    for mirror_name, url in candidates:
+        opened = open_pdf_stream_from_url(url, mirror_name, errors=errors)
+        if opened is not None:
+            return mirror_name, url, opened
+    return None
+
+
+def get_candidate_urls(paper):
+    """Mirror URLs to try for a paper
+
+    The URL that last worked for this paper comes first, the others follow
+    ordered by mirror health (learned across all papers); mirrors whose
+    circuit breaker is open are skipped.
+    """
+    reload_url_cache()
+    candidates = list(paper.get('urls', []))
+    cached = url_cache.get(paper_cache_key(paper))
+    if cached is None or cached[0] not in [url for _, url in candidates]:
+        # No winner yet, or one the catalog no longer lists
+        return mirror_health.order_candidates(candidates)
+
+    cached_url, cached_mirror = cached
+    others = [c for c in candidates if c[1] != cached_url]
+    return mirror_health.order_candidates([(cached_mirror, cached_url)])[:1] + \
+        mirror_health.order_candidates(others)
+
+
+def reload_url_cache(path=URL_CACHE_PATH):
+    """Merge the persisted winning mirrors again if the file changed since the last load"""
+    global url_cache_mtime
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return
+    if mtime != url_cache_mtime:
+        url_cache_mtime = mtime
+        load_url_cache(path)
+
+
+def load_url_cache(path=URL_CACHE_PATH):
+    """Merge persisted winning mirrors into url_cache (missing/corrupt file: no-op)"""
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return
+    if not isinstance(saved, dict):
+        return
+    for key, winner in saved.items():
+        if isinstance(winner, list) and len(winner) == 2:
+            url_cache.setdefault(key, tuple(winner))
+
+
+def save_url_cache(path=URL_CACHE_PATH):
+    """Persist url_cache atomically, keeping entries other runs saved"""
+    saved = {}
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if not isinstance(saved, dict):
+        saved = {}
+    saved.update({key: list(winner) for key, winner in url_cache.items()})
+
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.mirrors.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(saved, f, sort_keys=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def open_cached_pdf(paper):
+    """Find a paper's PDF in the local caches, without going to the mirrors
+
+    Returns (content, None, size) when it is in memory or small enough to be
+    promoted there from disk, (None, file, size) with the disk entry opened
+    for reading when it is too large for memory (an open file survives
+    eviction), or (None, None, None) when it is not cached.
+    """
+    key = paper_cache_key(paper)
+    content = memory_cache.get(key)
+    if content is not None:
+        return content, None, len(content)
+
+    cached_path = pdf_cache.get_path(key)
+    if cached_path is None:
+        return None, None, None
+    try:
+        size = os.path.getsize(cached_path)
+        if memory_cache.fits(size):
+            # Small enough to keep hot: promote to memory in one read
+            content = pdf_cache.get(key)
+            if content is not None:
+                memory_cache.put(key, content)
+                return content, None, len(content)
+        else:
+            return None, open(cached_path, 'rb'), size
+    except FileNotFoundError:
+        pass
+    return None, None, None
+
+
+def stream_cached_pdf(f):
+    """Yield an opened cached PDF file chunk by chunk, then close it"""
+    with f:
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def hash_pdf(body):
+    """Content hash of a PDF given as bytes or an open binary file (rewound after)"""
+    digest = hashlib.sha256()
+    if isinstance(body, bytes):
+        digest.update(body)
+    else:
+        for chunk in iter(lambda: body.read(STREAM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        body.seek(0)
+    return digest.hexdigest()[:32]
+
+
+def file_identity(fd):
+    """(device, inode, size) of an open file: which version of a cache entry it is"""
+    stat = os.fstat(fd)
+    return stat.st_dev, stat.st_ino, stat.st_size
+
+
+def pdf_etag(paper, body):
+    """Strong validator for a paper's cached PDF: a hash of its content
+
+    Fetches record the hash when they store the PDF; a PDF another worker
+    cached (or replaced) is hashed on its first use here. body is the cached
+    PDF as bytes or an open binary file.
+    """
+    key = paper_cache_key(paper)
+    if isinstance(body, bytes):
+        etag = memory_cache.content_hash(key, body)
+        if etag is None:
+            etag = hash_pdf(body)
+            memory_cache.set_content_hash(key, body, etag)
+        return etag
+
+    identity = file_identity(body.fileno())
+    known = content_hashes.get(key)
+    if known is not None and known[0] == identity:
+        return known[1]
+    etag = hash_pdf(body)
+    content_hashes[key] = (identity, etag)
+    return etag
+
+
+def cached_pdf_stream(paper):
+    """Chunks and size of a paper's PDF from the local caches, or (None, None)"""
+    content, cached_file, size = open_cached_pdf(paper)
+    if content is not None:
+        return iter([content]), size
+    if cached_file is not None:
+        return stream_cached_pdf(cached_file), size
+    return None, None
+
+
+def open_pdf_stream(paper, cache_checked=False):
+    """Stream a PDF with multiple mirror fallback
+
+    Mirrors are tried in the same order as fetch_pdf; a mirror is only
+    skipped if it fails before its first bytes are verified. Returns
+    (chunks, filename, content_length) - content_length is None when the
+    mirror did not announce it - or (None, None, None) if every mirror failed.
+    cache_checked means the caller already missed the local caches, so they
+    aren't looked up (and the miss counted) again.
+    """
+    # Serve from the local PDF caches when possible
+    if not cache_checked:
+        chunks, size = cached_pdf_stream(paper)
+        if chunks is not None:
+            return chunks, paper['filename'], str(size)
+
+    # Join the paper's in-flight fetch, or queue one; it is pumped by a
+    # scheduler thread, so upstream reads aren't paced by the slowest client
+    fetch, is_leader = join_fetch(paper)
+    if is_leader:
+        fetch_scheduler.submit(object(), fetch.run)
+    chunks = fetch.open_reader()
+    if chunks is not None:
+        return chunks, paper['filename'], fetch.content_length
+    if fetch.state == 'done':
+        # It finished and released its spool before we attached: cached now
+        chunks, size = cached_pdf_stream(paper)
+        if chunks is not None:
+            return chunks, paper['filename'], str(size)
+    return None, None, None
+
+
+class PaperFetch:
+    """One upstream fetch of a paper, shared by every request that wants it
+
+    The first request for a paper (the leader) runs the mirror fallback and
+    spools the winning mirror's body to disk - straight into the cache entry
+    being written, or a temp file when the disk cache is off - so memory use
+    doesn't grow with the PDF. Requests for the same paper arriving meanwhile
+    join it instead of going to the mirrors again: streaming readers follow
+    the spool file as it grows, buffered readers (joined with buffered=True)
+    wait for the complete PDF. The complete bytes are only built when they
+    fit the memory cache or a buffered reader needs them. The result is
+    cached before the fetch is unregistered, so later requests find it there.
+    """
+
+    def __init__(self, paper):
+        self.paper = paper
+        self.key = paper_cache_key(paper)
+        self.cond = threading.Condition()
+        self.state = 'pending'  # -> streaming -> done | failed
+        self.content_length = None
+        self.content = None
+        # Bytes spooled so far, and their running content hash
+        self.size = 0
+        self.digest = hashlib.sha256()
+        # Spool being written (a CacheWriter or temp file), and a read-only
+        # descriptor readers duplicate to follow it
+        self.writer = None
+        self.spool = None
+        self.spool_fd = None
+        # Joined callers that want the complete bytes from result()
+        self.buffered = 0
+        # Resolves to the complete PDF (None on failure) once the fetch ends
+        self.finished = concurrent.futures.Future()
+
+    def run(self):
+        """Fetch from the mirrors (leader only, on a fetch_scheduler thread)"""
+        try:
+            self._run()
+        finally:
+            self._unregister()
+            with self.cond:
+                if self.state in ('pending', 'streaming'):
+                    self.state = 'failed'
+                self._close_spool()
+                self.cond.notify_all()
+            self.finished.set_result(self.content)
+
+    def _run(self):
+        # A fetch that just finished may have filled the cache meanwhile;
+        # peeked at without counting a lookup, the caller already missed
+        content = memory_cache.peek(self.key)
+        if content is None and pdf_cache.contains(self.key):
+            content = pdf_cache.get(self.key)
+            if content is not None:
+                memory_cache.put(self.key, content)
+        if content:
+            self._publish_started(str(len(content)))
+            self._finish(content)
+            return
+
+        candidates = get_candidate_urls(self.paper)
+        errors = []
+        if HEDGE_REQUESTS:
+            won = open_pdf_stream_hedged(candidates, errors)
+        else:
+            won = open_pdf_stream_serial(candidates, errors)
+        if won is None:
+            # Every mirror (none skipped by its breaker) answered that it
+            # doesn't have the paper: a definite miss, not a transient one
+            if (candidates and len(candidates) == len(self.paper.get('urls', []))
+                    and len(errors) == len(candidates) and MISSING_ERRORS.issuperset(errors)):
+                availability_index.record(self.key, 'unavailable')
+            return
+
+        mirror_name, url, (first_bytes, chunks, response) = won
+        url_cache[self.key] = (url, mirror_name)
+        try:
+            content_length = None
+            if 'Content-Encoding' not in response.headers:
+                content_length = response.headers.get('Content-Length')
+            self._open_spool()
+            self._publish_started(content_length)
+            self._publish_chunk(first_bytes)
+            for chunk in chunks:
+                self._publish_chunk(chunk)
+        except (requests.RequestException, OSError):
+            # Mirror dropped mid-transfer (or the spool's disk is full);
+            # streaming readers get a short body (vs Content-Length),
+            # buffered readers get nothing
+            return
+        finally:
+            close_attempt(url, response)
+
+        if content_length and content_length.isdigit() and self.size != int(content_length):
+            return
+        etag = self.digest.hexdigest()[:32]
+        if self.writer is not None:
+            # The body is verified complete: publish the cache entry
+            try:
+                self.writer.commit()
+                content_hashes[self.key] = (file_identity(self.spool_fd), etag)
+            except OSError:
+                self.writer.discard()
+            self.writer = self.spool = None
+        availability_index.record(self.key, 'available', mirror_name, url)
+
+        content = None
+        if memory_cache.fits(self.size):
+            content = self._read_spool()
+            memory_cache.put(self.key, content, etag)
+        if self._unregister() and content is None:
+            content = self._read_spool()
+        self._finish(content)
+
+    def _unregister(self):
+        """Stop requests from joining, returns how many buffered callers joined"""
+        with inflight_lock:
+            if inflight.get(self.key) is self:
+                del inflight[self.key]
+            return self.buffered
+
+    def _open_spool(self):
+        self.writer = pdf_cache.open_writer(self.key)
+        if self.writer is not None:
+            self.spool = self.writer
+            self.spool_fd = os.open(self.writer.temp_path, os.O_RDONLY)
+        else:
+            self.spool = tempfile.TemporaryFile(prefix='cbse-fetch-')
+            self.spool_fd = os.dup(self.spool.fileno())
+
+    def _read_spool(self):
+        return os.pread(self.spool_fd, self.size, 0)
+
+    def _close_spool(self):
+        """Drop the spool (caller holds cond); readers keep their own descriptors"""
+        if self.writer is not None:
+            self.writer.discard()
+        elif self.spool is not None:
+            self.spool.close()
+        self.writer = self.spool = None
+        if self.spool_fd is not None:
+            os.close(self.spool_fd)
+            self.spool_fd = None
+
+    def _publish_started(self, content_length):
+        with self.cond:
+            self.content_length = content_length
+            self.state = 'streaming'
+            self.cond.notify_all()
+
+    def _publish_chunk(self, chunk):
+        self.spool.write(chunk)
+        self.spool.flush()
+        self.digest.update(chunk)
+        with self.cond:
+            self.size += len(chunk)
+            self.cond.notify_all()
+
+    def _finish(self, content):
+        with self.cond:
+            self.content = content
+            if content is not None:
+                self.size = len(content)
+            self.state = 'done'
+            self.cond.notify_all()
+
+    def open_reader(self):
+        """Wait for verified PDF bytes, then return an iterator over the body
+
+        The iterator follows the body as the leader receives it. Returns None
+        if the fetch failed, or finished and already released its spool.
+        """
+        with self.cond:
+            while self.state == 'pending':
+                self.cond.wait()
+            if self.content is not None:
+                return iter([self.content])
+            if self.spool_fd is None:
+                return None
+            # Closed with the file object even if the iterator is never started
+            reader = os.fdopen(os.dup(self.spool_fd), 'rb', buffering=0)
+        return self.iter_chunks(reader)
+
+    def iter_chunks(self, reader):
+        """Yield the spooled PDF chunk by chunk from reader, waiting for more while streaming"""
+        offset = 0
+        with reader:
+            while True:
+                with self.cond:
+                    while offset >= self.size and self.state == 'streaming':
+                        self.cond.wait()
+                    size = self.size
+                    finished = self.state != 'streaming'
+                while offset < size:
+                    chunk = os.pread(reader.fileno(), min(STREAM_CHUNK_SIZE, size - offset), offset)
+                    if not chunk:
+                        return
+                    offset += len(chunk)
+                    yield chunk
+                if finished:
+                    return
+
+    def result(self):
+        """Wait for the complete PDF, None if the fetch failed"""
+        return self.finished.result()
+
+
+def join_fetch(paper, buffered=False):
+    """Get the in-flight fetch for a paper, creating it if there is none
+
+    Returns (fetch, is_leader); the leader must get fetch.run() scheduled.
+    buffered callers will wait for the complete PDF with fetch.result().
+    """
+    key = paper_cache_key(paper)
+    with inflight_lock:
+        fetch = inflight.get(key)
+        is_leader = fetch is None
+        if is_leader:
+            fetch = inflight[key] = PaperFetch(paper)
+        if buffered:
+            fetch.buffered += 1
+        return fetch, is_leader
+
+
+def get_cached_pdf(key):
+    """Get PDF bytes from the memory cache, then the disk cache (promoting hits)"""
+    content = memory_cache.get(key)
+    if content is not None:
+        return content
+    content = pdf_cache.get(key)
+    if content is not None:
+        memory_cache.put(key, content)
+    return content
+
+
+def fetch_pdf(paper, cache_checked=False):
+    """Fetch PDF with multiple mirror fallback - tries all URLs until one works
+
+    Concurrent calls for the same paper (including streamed downloads) share
+    a single upstream fetch. cache_checked is as for open_pdf_stream.
+    """
+    # Serve from the local PDF caches when possible
+    if not cache_checked:
+        content = get_cached_pdf(paper_cache_key(paper))
+        if content:
+            return content, paper['filename']
+
+    fetch, is_leader = join_fetch(paper, buffered=True)
+    if is_leader:
+        fetch_scheduler.submit(object(), fetch.run)
+    content = fetch.result()
+    if content:
+        return content, paper['filename']
+    return None, None
+
+
+def start_fetch(paper, client):
+    """Future resolving to a paper's PDF bytes (None on failure)
+
+    Cached papers resolve immediately; otherwise the paper's in-flight fetch
+    is joined, or a new one is queued on fetch_scheduler under client.
+    """
+    content = get_cached_pdf(paper_cache_key(paper))
+    if content:
+        future = concurrent.futures.Future()
+        future.set_result(content)
+        return future
+    fetch, is_leader = join_fetch(paper, buffered=True)
+    if is_leader:
+        fetch_scheduler.submit(client, fetch.run)
+    return fetch.finished
+
+
+def iter_fetch_pdf_batch(papers, max_workers=FETCH_WORKERS):
+    """Fetch multiple PDFs concurrently, yielding (paper, content, filename) as each completes
+
+    At most max_workers papers are being fetched or waiting to be consumed
+    at any time, so a slow consumer holds back new fetches instead of
+    finished PDFs piling up in memory. content is None for a failed paper.
+    The whole batch queues as one client of fetch_scheduler, so it shares
+    the fetch threads fairly with other requests.
+    """
+    papers = iter(papers)
+    client = object()
+    pending = []
+
+    def start_next():
+        paper = next(papers, None)
+        if paper is not None:
+            pending.append((start_fetch(paper, client), paper))
+
+    for _ in range(max_workers):
+        start_next()
+    while pending:
+        concurrent.futures.wait(
+            [future for future, _ in pending], return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for entry in [entry for entry in pending if entry[0].done()]:
+            pending.remove(entry)
+            future, paper = entry
+            yield paper, future.result(), paper['filename']
+            start_next()
+
+
+# Start from the mirrors the last warm-up found for each paper
+reload_url_cache()
@@ -0,0 +1,61 @@
+"""
+Tests for Range header parsing (byte_ranges.py)
+
+    python -m pytest -q test_byte_ranges.py
+"""
+
+from byte_ranges import parse_byte_ranges, satisfiable_ranges, MAX_RANGES
+
+
+def test_parse_single_and_open_ranges():
+    assert parse_byte_ranges('bytes=0-499') == [(0, 500)]
+    assert parse_byte_ranges('bytes=500-') == [(500, None)]
+    assert parse_byte_ranges('Bytes = 0-0 ') == [(0, 1)]
+
+
+def test_parse_suffix_range():
+    assert parse_byte_ranges('bytes=-500') == [(-500, None)]
+    assert parse_byte_ranges('bytes=-0') is None
+
+
+def test_parse_keeps_order_and_overlaps():
+    assert parse_byte_ranges('bytes=500-599, 0-99,50-149') == [(500, 600), (0, 100), (50, 150)]
+
+
+def test_parse_rejects_garbage():
+    for header in ('bytes=', 'bytes=abc', 'bytes=5', 'bytes=10-5', 'bytes=1-2-3',
+                   'items=0-5', 'bytes=0-\xb2', 'bytes=\xb2-', 'bytes=-٣', 'bytes=+1-2'):
+        assert parse_byte_ranges(header) is None, header
+
+
+def test_satisfiable_suffix():
+    assert satisfiable_ranges('bytes=-100', 1000) == [(900, 1000)]
+    # Longer than the file: the whole file, sent as a plain 200
+    assert satisfiable_ranges('bytes=-5000', 1000) is None
+
+
+def test_satisfiable_merges_overlapping_and_out_of_order():
+    assert satisfiable_ranges('bytes=500-599,0-99,50-149', 1000) == [(0, 150), (500, 600)]
+    assert satisfiable_ranges('bytes=100-199,200-299', 1000) == [(100, 300)]
+
+
+def test_satisfiable_clamps_to_length():
+    assert satisfiable_ranges('bytes=900-5000', 1000) == [(900, 1000)]
+    assert satisfiable_ranges('bytes=900-', 1000) == [(900, 1000)]
+
+
+def test_satisfiable_unsatisfiable():
+    assert satisfiable_ranges('bytes=1000-', 1000) == []
+    assert satisfiable_ranges('bytes=2000-3000,1500-', 1000) == []
+
+
+def test_satisfiable_whole_file_or_too_many_ranges():
+    assert satisfiable_ranges('bytes=0-', 1000) is None
+    assert satisfiable_ranges('bytes=0-499,500-999', 1000) is None
+    many = ','.join(f'{i * 10}-{i * 10}' for i in range(MAX_RANGES + 1))
+    assert satisfiable_ranges(f'bytes={many}', 1000) is None
+
+
+def test_satisfiable_garbage():
+    assert satisfiable_ranges('bytes=0-\xb2', 1000) is None
+    assert satisfiable_ranges('nonsense', 1000) is None
@@ -0,0 +1,52 @@
+"""
+Tests for the fair fetch scheduler and per-mirror limits (fetch_scheduler.py)
+
+    python -m pytest -q test_fetch_scheduler.py
+"""
+
+import threading
+import pytest
+from fetch_scheduler import FetchScheduler, MirrorLimiter
+
+
+def test_clients_take_turns():
+    scheduler = FetchScheduler(1)
+    release = threading.Event()
+    order = []
+
+    scheduler.submit('first', release.wait, 5)
+    futures = [scheduler.submit('a', order.append, f'a{i}') for i in range(4)]
+    futures += [scheduler.submit('b', order.append, f'b{i}') for i in range(2)]
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    # b's jobs are not stuck behind all of a's
+    assert order == ['a0', 'b0', 'a1', 'b1', 'a2', 'a3']
+
+
+def test_job_errors_reach_the_future():
+    scheduler = FetchScheduler(1)
+    future = scheduler.submit('a', int, 'not a number')
+    with pytest.raises(ValueError):
+        future.result(5)
+    # The worker thread survives the failed job
+    assert scheduler.submit('a', int, '7').result(5) == 7
+
+
+def test_mirror_limiter_caps_each_host():
+    limiter = MirrorLimiter(1)
+    assert limiter.acquire('http://one.test/a.pdf', 1)
+    assert not limiter.acquire('http://one.test/b.pdf', 0.05)
+    # Other hosts have their own limit
+    assert limiter.acquire('http://two.test/a.pdf', 1)
+    limiter.release('http://one.test/a.pdf')
+    assert limiter.acquire('http://one.test/b.pdf', 1)
+
+
+def test_mirror_limiter_gives_up_when_cancelled():
+    limiter = MirrorLimiter(1)
+    cancel = threading.Event()
+    assert limiter.acquire('http://one.test/a.pdf', 1)
+    cancel.set()
+    assert not limiter.acquire('http://one.test/b.pdf', 5, cancel)
@@ -0,0 +1,148 @@
+"""
+Tests for shared upstream fetches (PaperFetch in pdf_fetcher.py), with the
+mirrors stubbed out at requests.Session.get
+
+    python -m pytest -q test_paper_fetch.py
+"""
+
+import os
+import threading
+import pytest
+import requests
+import pdf_fetcher
+from pdf_cache import DiskPDFCache, MemoryPDFCache
+
+MIRROR_URL = 'http://mirror.test/paper.pdf'
+BODY = b'%PDF-1.4\n' + bytes(range(256)) * 1200
+
+
+class FakeResponse:
+    """Streamed mirror response; chunks after the first wait for gate, if given"""
+
+    def __init__(self, body, gate=None, drop_at=None):
+        self.body = body
+        self.gate = gate
+        self.drop_at = drop_at
+        self.status_code = 200
+        self.headers = {'Content-Length': str(len(body))}
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if start and self.gate is not None:
+                self.gate.wait(5)
+            if self.drop_at is not None and start >= self.drop_at:
+                raise requests.ConnectionError('mirror dropped the connection')
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def mirror(monkeypatch, tmp_path):
+    """Fresh caches and a stubbed mirror; returns the stub's state (calls, response kwargs)"""
+    disk = DiskPDFCache(str(tmp_path), 100 * 1024 * 1024)
+    monkeypatch.setattr(pdf_fetcher, 'pdf_cache', disk)
+    # Too small to hold BODY, so readers go through the spool and disk paths
+    monkeypatch.setattr(pdf_fetcher, 'memory_cache', MemoryPDFCache(64 * 1024, 64 * 1024))
+    monkeypatch.setattr(pdf_fetcher, 'url_cache', {})
+    monkeypatch.setattr(pdf_fetcher, 'content_hashes', {})
+    monkeypatch.setattr(pdf_fetcher, 'reload_url_cache', lambda: None)
+
+    state = {'calls': 0, 'kwargs': {}, 'disk': disk}
+    lock = threading.Lock()
+
+    def fake_get(session, url, **kwargs):
+        with lock:
+            state['calls'] += 1
+        return FakeResponse(BODY, **state['kwargs'])
+
+    monkeypatch.setattr(requests.Session, 'get', fake_get)
+    return state
+
+
+def make_paper(name='paper.pdf'):
+    return {'id': 1, 'filename': name, 'urls': [('cbse', MIRROR_URL)]}
+
+
+def test_concurrent_downloads_share_one_upstream_get(mirror):
+    gate = threading.Event()
+    mirror['kwargs'] = {'gate': gate}
+    paper = make_paper()
+    results = []
+    lock = threading.Lock()
+
+    def stream():
+        chunks, _, content_length = pdf_fetcher.open_pdf_stream(paper)
+        body = b''.join(chunks)
+        with lock:
+            results.append((body, content_length))
+
+    def buffered():
+        content, _ = pdf_fetcher.fetch_pdf(paper)
+        with lock:
+            results.append((content, str(len(content))))
+
+    threads = [threading.Thread(target=stream) for _ in range(6)]
+    threads += [threading.Thread(target=buffered) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    # Let every request join the fetch while the mirror is mid-transfer
+    threading.Event().wait(0.3)
+    gate.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert mirror['calls'] == 1
+    assert len(results) == 8
+    assert all(body == BODY and length == str(len(BODY)) for body, length in results)
+    assert mirror['disk'].contains(paper['filename'])
+    assert not pdf_fetcher.inflight
+
+
+def test_dropped_transfer_leaves_no_cache_entry(mirror, tmp_path):
+    gate = threading.Event()
+    mirror['kwargs'] = {'gate': gate, 'drop_at': 128 * 1024}
+    paper = make_paper()
+
+    # Attach while the mirror is mid-transfer, then let it drop
+    chunks, _, content_length = pdf_fetcher.open_pdf_stream(paper)
+    gate.set()
+    body = b''.join(chunks)
+
+    # The client sees a body shorter than the announced length
+    assert content_length == str(len(BODY))
+    assert 0 < len(body) < len(BODY)
+    assert not mirror['disk'].contains(paper['filename'])
+    assert os.listdir(tmp_path) == []
+    mirror['kwargs'] = {'drop_at': 128 * 1024}
+    assert pdf_fetcher.fetch_pdf(paper) == (None, None)
+    assert mirror['calls'] == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_request_after_fetch_finished_is_served_from_cache(mirror):
+    paper = make_paper()
+    content, _ = pdf_fetcher.fetch_pdf(paper)
+    assert content == BODY
+
+    chunks, _, content_length = pdf_fetcher.open_pdf_stream(paper)
+    assert b''.join(chunks) == BODY
+    assert content_length == str(len(BODY))
+    assert mirror['calls'] == 1
+
+
+def test_join_after_spool_released_falls_back_to_cache(mirror, monkeypatch):
+    paper = make_paper()
+    fetch, is_leader = pdf_fetcher.join_fetch(paper)
+    assert is_leader
+    fetch.run()
+    # Too large for memory, so the finished fetch kept no bytes and released its spool
+    assert fetch.state == 'done' and fetch.open_reader() is None
+
+    # A request that joined just before the fetch was unregistered
+    monkeypatch.setattr(pdf_fetcher, 'join_fetch', lambda paper: (fetch, False))
+    chunks, _, content_length = pdf_fetcher.open_pdf_stream(paper, cache_checked=True)
+    assert b''.join(chunks) == BODY
+    assert content_length == str(len(BODY))
+    assert mirror['calls'] == 1
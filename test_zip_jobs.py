@@ -0,0 +1,123 @@
+"""
+Tests for background ZIP job state handling (zip_jobs.py)
+
+    python -m pytest -q test_zip_jobs.py
+"""
+
+import json
+import os
+import threading
+import time
+import zipfile
+import zip_jobs
+from zip_jobs import ZipJobQueue
+
+
+def build_entries(papers, progress):
+    for name, content in papers:
+        progress(content is not None)
+        if content is not None:
+            yield name, content
+
+
+def wait_for(queue, job_id, statuses=('done', 'failed')):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        state = queue.get(job_id)
+        if state is not None and state['status'] in statuses:
+            return state
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not reach {statuses}')
+
+
+def test_job_runs_to_done(tmp_path):
+    queue = ZipJobQueue(str(tmp_path), build_entries)
+    papers = [('a.pdf', b'%PDF-a'), ('b.pdf', None), ('c.pdf', b'%PDF-c')]
+    state = queue.submit(papers, 'bundle.zip')
+    assert state['status'] == 'queued' and state['total'] == 3
+
+    state = wait_for(queue, state['job_id'])
+    assert state['status'] == 'done'
+    assert (state['fetched'], state['failed']) == (2, 1)
+    assert state['finished_at'] is not None
+    with zipfile.ZipFile(queue.archive_path(state['job_id'])) as archive:
+        assert archive.namelist() == ['a.pdf', 'c.pdf']
+    # Only the state file and the archive are left behind
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{state['job_id']}.json", f"{state['job_id']}.zip"])
+
+
+def test_job_reports_running(tmp_path):
+    release = threading.Event()
+
+    def slow_entries(papers, progress):
+        release.wait(5)
+        yield from build_entries(papers, progress)
+
+    queue = ZipJobQueue(str(tmp_path), slow_entries)
+    job_id = queue.submit([('a.pdf', b'%PDF-a')], 'bundle.zip')['job_id']
+    assert wait_for(queue, job_id, ('running',))['status'] == 'running'
+    release.set()
+    assert wait_for(queue, job_id)['status'] == 'done'
+
+
+def test_failed_build_leaves_no_archive(tmp_path):
+    def broken_entries(papers, progress):
+        yield 'a.pdf', b'%PDF-a'
+        raise OSError('mirror went away')
+
+    queue = ZipJobQueue(str(tmp_path), broken_entries)
+    job_id = queue.submit([('a.pdf', b'%PDF-a')], 'bundle.zip')['job_id']
+    state = wait_for(queue, job_id)
+    assert state['status'] == 'failed'
+    assert state['error'] == 'mirror went away'
+    assert os.listdir(tmp_path) == [f'{job_id}.json']
+
+
+def test_full_queue_turns_jobs_away(tmp_path):
+    release = threading.Event()
+
+    def blocked_entries(papers, progress):
+        release.wait(5)
+        yield from build_entries(papers, progress)
+
+    queue = ZipJobQueue(str(tmp_path), blocked_entries, max_workers=1, max_queued=2)
+    papers = [('a.pdf', b'%PDF-a')]
+    running = queue.submit(papers, 'bundle.zip')
+    wait_for(queue, running['job_id'], ('running',))
+    queued = [queue.submit(papers, 'bundle.zip') for _ in range(2)]
+    assert all(state is not None for state in queued)
+    assert queue.submit(papers, 'bundle.zip') is None
+
+    release.set()
+    for state in [running] + queued:
+        assert wait_for(queue, state['job_id'])['status'] == 'done'
+    # Room again once the queue drained
+    assert queue.submit(papers, 'bundle.zip') is not None
+
+
+def test_disk_budget(tmp_path):
+    queue = ZipJobQueue(str(tmp_path), build_entries, max_bytes=4096)
+    job_id = queue.submit([('a.pdf', b'%PDF-' + b'x' * 8192)], 'bundle.zip')['job_id']
+    state = wait_for(queue, job_id)
+    assert state['status'] == 'failed'
+    assert not os.path.exists(queue.archive_path(job_id))
+
+    (tmp_path / 'filler').write_bytes(b'x' * 4096)
+    assert queue.submit([('a.pdf', b'%PDF-a')], 'bundle.zip') is None
+
+
+def test_unknown_malformed_and_interrupted_jobs(tmp_path):
+    queue = ZipJobQueue(str(tmp_path), build_entries)
+    assert queue.get('../../etc/passwd') is None
+    assert queue.get('A' * 16) is None
+
+    (tmp_path / f"{'B' * 16}.json").write_text('{not json')
+    assert queue.get('B' * 16) is None
+    (tmp_path / f"{'C' * 16}.json").write_text(json.dumps({'job_id': 'C' * 16, 'status': 'done'}))
+    assert queue.get('C' * 16) is None
+
+    # Left running by a worker that no longer exists
+    state = {field: None for field in zip_jobs.STATE_FIELDS}
+    state.update(job_id='D' * 16, status='running', total=1, fetched=0, failed=0, created_at=time.time(), pid=2 ** 40)
+    (tmp_path / f"{'D' * 16}.json").write_text(json.dumps(state))
+    assert queue.get('D' * 16)['status'] == 'failed'
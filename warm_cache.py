@@ -0,0 +1,128 @@
+"""
+CBSE Previous Year Papers - Cache warm-up
+Fetches papers through the normal mirror fallback to fill the shared PDF cache
+and record each paper's winning mirror, then prints a coverage report
+Run after each deploy and before exam season:
+
+    python warm_cache.py [--year 2024] [--subject Mathematics] [--type question_paper]
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from paper_database_v3 import filter_papers
+from pdf_cache import pdf_cache, paper_cache_key, PDF_CACHE_MAX_BYTES
+from pdf_fetcher import iter_fetch_pdf_batch, save_url_cache, url_cache, URL_CACHE_PATH, FETCH_WORKERS
+from fetch_scheduler import FETCH_CONCURRENCY
+from availability_index import availability_index
+
+# Progress line every this many papers
+PROGRESS_EVERY = 50
+
+# Winning mirrors are saved every this many papers, so an interrupted run
+# keeps what it found
+SAVE_EVERY = 200
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Prefetch paper PDFs into the shared cache')
+    parser.add_argument('--year', help='Only papers from this year')
+    parser.add_argument('--subject', help='Only papers for this subject')
+    parser.add_argument('--type', dest='paper_type', help='Only papers of this type')
+    parser.add_argument('--workers', type=int, default=FETCH_WORKERS,
+                        help=f'Papers fetched at once (default {FETCH_WORKERS}, at most {FETCH_CONCURRENCY}: '
+                             'the fetch scheduler runs no more)')
+    parser.add_argument('--list-failed', action='store_true', help='Print every paper that could not be fetched')
+    return parser.parse_args(argv)
+
+
+def coverage_line(label, ok, total):
+    percent = 100.0 * ok / total if total else 0.0
+    return f"  {label:<28} {ok:>5}/{total:<5} {percent:5.1f}%"
+
+
+def warm_cache(papers, workers):
+    """Fetch papers into the cache, returns (outcomes, fetched_bytes)
+
+    outcomes maps paper id -> 'cached' (already on disk), 'fetched' or 'failed'.
+    """
+    # Papers already on disk before the run, so the report can tell them apart
+    cached_before = {p['id'] for p in papers if pdf_cache.get_path(paper_cache_key(p)) is not None}
+    outcomes = {}
+    fetched_bytes = 0
+    started = time.monotonic()
+    try:
+        for done, (paper, content, _) in enumerate(iter_fetch_pdf_batch(papers, max_workers=workers), 1):
+            if paper['id'] in cached_before:
+                outcomes[paper['id']] = 'cached'
+            elif content:
+                outcomes[paper['id']] = 'fetched'
+                fetched_bytes += len(content)
+            else:
+                outcomes[paper['id']] = 'failed'
+            if done % PROGRESS_EVERY == 0 or done == len(papers):
+                failed = sum(1 for outcome in outcomes.values() if outcome == 'failed')
+                print(f"[{time.monotonic() - started:7.1f}s] {done}/{len(papers)} papers, {failed} failed",
+                      flush=True)
+            if done % SAVE_EVERY == 0:
+                save_url_cache()
+    finally:
+        save_url_cache()
+        # Papers served during the warm-up are known available
+        availability_index.save()
+    return outcomes, fetched_bytes
+
+
+def print_report(papers, outcomes, fetched_bytes, list_failed):
+    counts = Counter(outcomes.values())
+    ok = counts['cached'] + counts['fetched']
+    print()
+    print("Coverage report")
+    print(coverage_line('All papers', ok, len(papers)))
+    print(f"  already cached: {counts['cached']}, fetched: {counts['fetched']} "
+          f"({fetched_bytes / (1024 * 1024):.1f} MiB), failed: {counts['failed']}")
+
+    for field, label in (('subject', 'By subject'), ('year', 'By year'), ('type', 'By type')):
+        totals = Counter(p[field] for p in papers)
+        oks = Counter(p[field] for p in papers if outcomes.get(p['id']) != 'failed')
+        print(f"\n{label}:")
+        for value in sorted(totals, key=str):
+            print(coverage_line(str(value), oks[value], totals[value]))
+
+    winners = Counter(url_cache[paper_cache_key(p)][1] for p in papers if paper_cache_key(p) in url_cache)
+    if winners:
+        print("\nWinning mirrors:")
+        for mirror_name, count in winners.most_common():
+            print(f"  {mirror_name:<28} {count:>5}")
+    print(f"\nWinning mirrors saved to {URL_CACHE_PATH}")
+
+    failed = [p for p in papers if outcomes.get(p['id']) == 'failed']
+    if failed and list_failed:
+        print("\nUnavailable papers:")
+        for paper in failed:
+            print(f"  {paper['id']:>5}  {paper['display_name']}")
+
+    if not pdf_cache.enabled:
+        print("\nWARNING: the PDF cache is disabled (PDF_CACHE_MAX_BYTES=0), nothing was kept")
+    elif fetched_bytes > PDF_CACHE_MAX_BYTES:
+        print(f"\nWARNING: fetched more than PDF_CACHE_MAX_BYTES ({PDF_CACHE_MAX_BYTES} bytes); "
+              "the earliest papers were evicted again - raise the cap or narrow the filters")
+
+
+def main(argv):
+    args = parse_args(argv)
+    papers = filter_papers(year=args.year, subject=args.subject, paper_type=args.paper_type)
+    if not papers:
+        print("No papers match the filters")
+        return 1
+
+    workers = min(max(1, args.workers), FETCH_CONCURRENCY)
+    print(f"Warming {len(papers)} papers into {pdf_cache.directory} with {workers} workers", flush=True)
+    outcomes, fetched_bytes = warm_cache(papers, workers)
+    print_report(papers, outcomes, fetched_bytes, args.list_failed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
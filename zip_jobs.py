@@ -0,0 +1,220 @@
+"""
+CBSE Previous Year Papers - Background ZIP jobs
+Builds large paper bundles in the background, spooled to disk, for clients to
+poll and download when ready (no request held open)
+Job state lives in files, so any gunicorn worker can report on any job
+"""
+
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+import zipfile
+import concurrent.futures
+from pdf_cache import PDF_CACHE_DIR
+
+ZIP_JOBS_DIR = os.environ.get('ZIP_JOBS_DIR', os.path.normpath(PDF_CACHE_DIR) + '-zip-jobs')
+
+# Jobs each worker builds at once; more are queued, up to ZIP_JOB_MAX_QUEUED
+# waiting per worker before new submissions are turned away
+ZIP_JOB_WORKERS = 2
+ZIP_JOB_MAX_QUEUED = 8
+
+# Disk budget (bytes) for all archives in ZIP_JOBS_DIR: no new jobs are
+# accepted while it is used up, and a build that runs past it fails
+ZIP_JOBS_MAX_BYTES = int(os.environ.get('ZIP_JOBS_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+
+# Finished archives (and abandoned jobs) are deleted after this many seconds
+ZIP_JOB_TTL = 3600
+
+# Progress is written to the job's state file at most this often (seconds)
+PROGRESS_INTERVAL = 1.0
+
+JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16}$')
+
+# Fields every state file has; a file missing any is treated as unknown
+STATE_FIELDS = ('job_id', 'status', 'total', 'fetched', 'failed', 'download_name',
+                'created_at', 'finished_at', 'pid')
+
+
+def pid_alive(pid):
+    """Whether a process (the worker that owns a job) still exists"""
+    try:
+        os.kill(pid, 0)
+    except (ProcessLookupError, OverflowError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ZipJobQueue:
+    """Queue of ZIP jobs built by this worker, with state shared through files
+
+    Each job has <id>.json (status, counts, timestamps) and, once done,
+    <id>.zip. States are queued -> running -> done | failed. The archive is
+    written to a temp file and renamed into place when complete.
+    build_entries(papers, progress) must yield (name, content) entries and
+    call progress(ok) once per paper.
+    """
+
+    def __init__(self, directory, build_entries, max_workers=ZIP_JOB_WORKERS, max_queued=ZIP_JOB_MAX_QUEUED,
+                 max_bytes=ZIP_JOBS_MAX_BYTES):
+        self.directory = directory
+        self.build_entries = build_entries
+        self.max_queued = max_queued
+        self.max_bytes = max_bytes
+        self.queued = 0
+        self.lock = threading.Lock()
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='zip-job'
+        )
+
+    def state_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def archive_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.zip')
+
+    def _write_state(self, job_id, state):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f'.{job_id}.', suffix='.json.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path(job_id))
+
+    def disk_usage(self):
+        """Bytes used by every job's files, finished and in progress, across workers"""
+        total = 0
+        try:
+            scan = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for entry in scan:
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
+
+    def submit(self, papers, download_name):
+        """Queue a job for papers, returns its state, or None if the queue or disk budget is full"""
+        with self.lock:
+            if self.queued >= self.max_queued:
+                return None
+            self.queued += 1
+        job_id = secrets.token_urlsafe(12)
+        state = {
+            'job_id': job_id,
+            'status': 'queued',
+            'total': len(papers),
+            'fetched': 0,
+            'failed': 0,
+            'download_name': download_name,
+            'created_at': time.time(),
+            'finished_at': None,
+            'pid': os.getpid(),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.cleanup()
+            if self.disk_usage() >= self.max_bytes:
+                with self.lock:
+                    self.queued -= 1
+                return None
+            self._write_state(job_id, state)
+        except OSError:
+            with self.lock:
+                self.queued -= 1
+            raise
+        queued = dict(state)
+        self.executor.submit(self._build, state, papers)
+        return queued
+
+    def _build(self, state, papers):
+        with self.lock:
+            self.queued -= 1
+        job_id = state['job_id']
+        last_write = time.monotonic()
+
+        def progress(ok):
+            nonlocal last_write
+            state['fetched' if ok else 'failed'] += 1
+            if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+                self._write_state(job_id, state)
+                last_write = time.monotonic()
+
+        temp_path = None
+        try:
+            state['status'] = 'running'
+            self._write_state(job_id, state)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f'.{job_id}.', suffix='.zip.tmp')
+            with os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as zip_file:
+                for name, content in self.build_entries(papers, progress):
+                    zip_file.writestr(name, content)
+                    f.flush()
+                    if self.disk_usage() > self.max_bytes:
+                        raise RuntimeError('Not enough space for ZIP jobs right now, please try again later')
+            os.replace(temp_path, self.archive_path(job_id))
+            state['status'] = 'done'
+        except Exception as e:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+            state['status'] = 'failed'
+            state['error'] = str(e)
+        state['finished_at'] = time.time()
+        self._write_state(job_id, state)
+
+    def get(self, job_id):
+        """Current state of a job, or None if it is unknown or expired"""
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self.state_path(job_id)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or any(field not in state for field in STATE_FIELDS):
+            return None
+        pid = state['pid']
+        if state['status'] in ('queued', 'running') and not (isinstance(pid, int) and pid_alive(pid)):
+            # The worker building it went away (restart, crash)
+            state['status'] = 'failed'
+            state['error'] = 'Job was interrupted, please submit it again'
+        return state
+
+    def cleanup(self):
+        """Delete expired jobs: finished ones past the TTL, abandoned ones as well"""
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith('.json') or name.startswith('.'):
+                continue
+            job_id = name[:-len('.json')]
+            state = self.get(job_id)
+            if state is None:
+                continue
+            finished = state['finished_at'] or (state['status'] == 'failed' and state['created_at'])
+            if finished and now - finished > ZIP_JOB_TTL:
+                for path in (self.archive_path(job_id), self.state_path(job_id)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        # Temp files of builds that died mid-write
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') and name.endswith('.tmp'):
+                state = self.get(name[1:17])
+                if state is not None and state['status'] in ('queued', 'running'):
+                    continue
+                try:
+                    if now - os.path.getmtime(path) > ZIP_JOB_TTL:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
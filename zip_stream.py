@@ -0,0 +1,48 @@
+"""
+CBSE Previous Year Papers - Streaming ZIP writer
+Builds a ZIP archive on the fly so bundle downloads start immediately
+Each entry is sent as soon as it is written; nothing but the current entry is buffered
+"""
+
+import zipfile
+
+
+class ZipOutput:
+    """Write-only, non-seekable sink for ZipFile that hands out what was written
+
+    Without seek/tell, ZipFile writes each entry's sizes and CRC in a data
+    descriptor after the entry instead of patching its header, so every byte
+    can be sent as soon as it is written.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Take everything written since the last drain"""
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of (name, content) entries chunk by chunk
+
+    Entries are stored uncompressed: the PDFs are compressed already, so
+    deflating them again costs CPU for next to no size. entries may be a
+    generator that produces each entry only when it is ready.
+    """
+    output = ZipOutput()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as zip_file:
+        for name, content in entries:
+            zip_file.writestr(name, content)
+            yield output.drain()
+    # Central directory, written on close
+    yield output.drain()